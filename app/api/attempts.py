@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, status
+from fastapi.concurrency import run_in_threadpool
+from app.api.auth import get_current_user
+from app.models.attempt import AttemptSubmission
+from app.services.attempt_service import answer_keys, attempt_buffer, grade_answers, get_quiz_stats
+
+router = APIRouter(prefix="/courses/{course_id}/documents/{document_id}", tags=["Attempts"])
+
+
+@router.post(
+    "/attempts",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Enviar las respuestas de un estudiante"
+)
+async def submit_attempt(
+    submission: AttemptSubmission,
+    course_id: str = Path(..., description="ID del curso"),
+    document_id: str = Path(..., description="ID del documento"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Califica las respuestas y devuelve el resultado de inmediato. El intento
+    y los contadores por quiz se escriben en Firestore en segundo plano,
+    agrupados con los de otros estudiantes (de ahí el 202).
+    """
+    try:
+        graded = await grade_answers(course_id, document_id, submission.answers, answer_keys)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+    attempt_id = await attempt_buffer.add(course_id, document_id, user_id, graded)
+    score = sum(1 for answer in graded if answer["correct"])
+    return {
+        "attemptId": attempt_id,
+        "score": score,
+        "total": len(graded),
+        "answers": graded
+    }
+
+
+@router.get(
+    "/quizzes/{quiz_id}/stats",
+    summary="Intentos y tasa de acierto de un quiz"
+)
+async def get_quiz_attempt_stats(
+    course_id: str = Path(..., description="ID del curso"),
+    document_id: str = Path(..., description="ID del documento"),
+    quiz_id: str = Path(..., description="ID del quiz")
+):
+    try:
+        return await run_in_threadpool(get_quiz_stats, course_id, document_id, quiz_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -2,9 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth, exceptions
 from typing import Optional
+from app.services.firebase import get_app
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -20,7 +22,7 @@ async def get_current_user(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Esquema de autenticación inválido"
             )
-        decoded_token = auth.verify_id_token(credentials.credentials)
+        decoded_token = auth.verify_id_token(credentials.credentials, app=get_app())
         return decoded_token["uid"]
     except (exceptions.InvalidIdTokenError, exceptions.ExpiredIdTokenError) as e:
         if not required:
@@ -37,10 +39,21 @@ async def get_current_user(
             detail=f"Error de autenticación: {str(e)}"
         )
 
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[str]:
+    """
+    Igual que get_current_user, pero retorna None si no hay token
+    o si es inválido, en lugar de responder 401.
+    """
+    if credentials is None:
+        return None
+    return await get_current_user(credentials, required=False)
+
 @router.get("/me")
 async def get_user_data(user_id: str = Depends(get_current_user)):
     try:
-        user = auth.get_user(user_id)
+        user = auth.get_user(user_id, app=get_app())
         return {
             "email": user.email,
             "uid": user.uid,
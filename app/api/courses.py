@@ -1,8 +1,13 @@
-from typing import List
-from fastapi import APIRouter,Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter,Depends, HTTPException, status, Header, Response, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.models.course import CourseCreate
 from app.models.response import CourseResponse
 from app.services.course_service import CourseService
+from app.services.export_service import export_course, get_course_data
+from app.services.etag import etag_matches, cache_headers
+from app.services.search_service import course_indexes
 from app.api.auth import get_current_user
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
@@ -44,8 +49,64 @@ def get_course(course_id: str,user_id: str = Depends(get_current_user)):
     
 
 @router.get("/{course_id}/documents")
-async def get_documents_by_course(course_id: str):
+async def get_documents_by_course(
+    course_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None)
+):
     try:
+        # Si el cliente ya tiene esta versión, 304 sin leer los documentos
+        etag = await run_in_threadpool(CourseService.get_documents_etag, course_id)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+        response.headers.update(cache_headers(etag))
         return CourseService.get_documents_by_course(course_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/{course_id}/summary")
+async def get_course_summary(course_id: str):
+    """Progreso y totales del curso, sin recorrer sus documentos."""
+    try:
+        return await run_in_threadpool(CourseService.get_course_summary, course_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/{course_id}/search")
+async def search_course(
+    course_id: str,
+    q: str = Query(..., min_length=1, max_length=200, description="Texto a buscar"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Busca en títulos de documentos, preguntas, opciones y contextos del
+    curso con un índice en memoria. Sólo la primera búsqueda en un curso
+    (o tras vencer el índice) lee Firestore.
+    """
+    try:
+        return await course_indexes.search(course_id, q, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get(
+    "/{course_id}/export",
+    summary="Exportar curso completo como NDJSON",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def export_course_ndjson(course_id: str):
+    """
+    Exporta el curso, sus documentos, quizzes y opciones como NDJSON
+    (una línea JSON por registro), enviado a medida que se lee.
+    """
+    try:
+        course_data = await run_in_threadpool(get_course_data, course_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(
+        export_course(course_id, course_data),
+        media_type="application/x-ndjson"
+    )
@@ -1,18 +1,214 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status,Path
+import asyncio
+import logging
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status,Path, Depends, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path as FilePath # ESTE ES IMPORTANTE
-from typing import List
-from app.services.firebase import bucket
-from app.services.document_service import save_to_firestore
-from app.services.npl_service import quiz_generator 
-from app.services.file_processor import extract_text_from_file
-from app.services.document_service import get_quizzes_by_document
-from app.models.document import DocumentResponse
-from app.models.quiz import QuizResponse
+from typing import Dict, List, Optional
+from app.api.auth import get_optional_user
+from app.config import UPLOAD_FAIRNESS, STORE_PARSED_DOC
+from app.services.admission import upload_admission, AdmissionRejected, GLOBAL_KEY
+from app.services.document_service import (
+    save_to_firestore,
+    find_existing_upload,
+    get_document,
+    get_document_metadata,
+    get_quizzes_etag,
+    replace_quizzes,
+    set_document_completed,
+    DuplicateUploadError
+)
+from app.services.etag import etag_matches, cache_headers
+from app.services.idempotency import upload_flights
+from app.services.attempt_service import answer_keys
+from app.services.search_service import quiz_texts
+from app.services.quiz_import import import_quizzes, iter_ndjson, iter_json_array
+from app.services.npl_service import (
+    quiz_generator,
+    GenerationMode,
+    pipeline_id,
+    serialize_docs,
+    deserialize_docs,
+    combine_docs
+)
+from app.services.file_processor import extract_chunks_from_bytes, fingerprint_chunk
+from app.services.storage_service import (
+    content_hash,
+    upload_original,
+    save_text_artifact,
+    load_text_artifact,
+    save_doc_artifact,
+    load_doc_artifact
+)
+from app.services.document_service import get_quizzes_by_document, get_quizzes_by_documents
+from app.models.document import DocumentResponse, RegenerateRequest, CompletionRequest
+from app.models.quiz import QuizResponse, BatchQuizRequest
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/courses/{course_id}/documents", tags=["Documents"])
 
 
+VALID_EXTENSIONS = ['.pdf', '.docx', '.pptx']
+
+
+def _validate_extension(filename: str) -> str:
+    """Devuelve la extensión del archivo o responde 400 si no está soportada."""
+    file_extension = FilePath(filename).suffix.lower()
+    if file_extension not in VALID_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato {file_extension} no soportado. Use: {', '.join(VALID_EXTENSIONS)}"
+        )
+    return file_extension
+
+
+def _admission_key(course_id: str, user_id: Optional[str]) -> str:
+    """Clave con la que se reparte la cola de subidas (ver UPLOAD_FAIRNESS)."""
+    if UPLOAD_FAIRNESS == "course":
+        return f"course:{course_id}"
+    if UPLOAD_FAIRNESS == "user":
+        # Las subidas sin usuario comparten un turno propio, no el global
+        return f"user:{user_id}" if user_id else "anonymous"
+    return GLOBAL_KEY
+
+
+async def _wait_quietly(task: asyncio.Future):
+    """Espera una tarea ignorando su error (ya se está propagando otro)."""
+    try:
+        await task
+    except Exception:
+        pass
+
+
+def _store_artifacts(digest: str, text: str, chunk_docs: list, mode: GenerationMode):
+    """
+    Guarda el texto extraído (y los Docs de cada fragmento si STORE_PARSED_DOC)
+    para regenerar quizzes más adelante. Un fallo aquí no invalida la subida.
+    """
+    try:
+        save_text_artifact(digest, text)
+        if STORE_PARSED_DOC:
+            save_doc_artifact(digest, pipeline_id(mode), serialize_docs(chunk_docs))
+    except Exception:
+        logger.exception("No se pudieron guardar los artefactos de %s", digest)
+
+
+def _extract_chunks(content: bytes, file_extension: str) -> List[str]:
+    """Extrae los fragmentos del archivo validando que haya texto suficiente."""
+    try:
+        chunks = extract_chunks_from_bytes(content, file_extension)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail= str(e)) 
+    if sum(len(chunk.split()) for chunk in chunks) < 30:  # Mínimo 30 palabras
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,detail="El documento no contiene suficiente texto")
+    return chunks
+
+
+def _parse_chunks(chunks: List[str], previous_docs: list, mode: GenerationMode):
+    """
+    Analiza sólo los fragmentos cuya huella no está entre los Docs previos;
+    el resto se reutiliza. Devuelve (Docs de todos los fragmentos, Docs de
+    los fragmentos nuevos o modificados).
+    """
+    previous = {fingerprint_chunk(doc.text): doc for doc in previous_docs}
+    fingerprints = [fingerprint_chunk(chunk) for chunk in chunks]
+    changed = [chunk for chunk, fp in zip(chunks, fingerprints) if fp not in previous]
+    parsed = iter(quiz_generator.parse_chunks(changed, mode))
+
+    chunk_docs = []
+    changed_docs = []
+    for fp in fingerprints:
+        if fp in previous:
+            chunk_docs.append(previous[fp])
+        else:
+            doc = next(parsed)
+            chunk_docs.append(doc)
+            changed_docs.append(doc)
+    return chunk_docs, changed_docs
+
+
+async def _process_upload(
+    course_id: str,
+    file: UploadFile,
+    content: bytes,
+    digest: str,
+    file_extension: str,
+    num_questions: int,
+    num_options: int,
+    mode: GenerationMode,
+    user_id: Optional[str],
+    idempotency_key: Optional[str]
+) -> DocumentResponse:
+    """Procesa una subida que no está duplicada en el curso."""
+    # Reintento de una subida ya procesada: se devuelve sin extraer ni escribir
+    existing_id = await run_in_threadpool(find_existing_upload, course_id, digest, idempotency_key)
+    if existing_id:
+        return await get_document(course_id, existing_id)
+
+    # Control de admisión: limita cuántas subidas se procesan a la vez
+    async with upload_admission.slot(_admission_key(course_id, user_id)):
+        # 2. Extraer texto (por páginas, párrafos o diapositivas). Se valida
+        # antes de subir el original: un archivo rechazado no llega a Storage
+        chunks = await run_in_threadpool(_extract_chunks, content, file_extension)
+        text = "\n".join(chunks)
+
+        # El original se sube a Storage en paralelo con el NLP
+        storage_task = asyncio.ensure_future(run_in_threadpool(
+            upload_original, file.file, digest, file_extension, file.content_type
+        ))
+        artifacts_task = None
+        try:
+            #logger.info(f"Texto extraído (primeros 100 chars): {text[:100]}") 
+            # 3. Generar quizzes
+            # El análisis con spaCy es CPU intensivo: fuera del event loop
+            chunk_docs = await run_in_threadpool(quiz_generator.parse_chunks, chunks, mode)
+            doc = await run_in_threadpool(combine_docs, chunk_docs)
+            # Texto y Docs se guardan para poder regenerar sin re-procesar
+            artifacts_task = asyncio.ensure_future(run_in_threadpool(
+                _store_artifacts, digest, text, chunk_docs, mode
+            ))
+            quizzes = await run_in_threadpool(
+                quiz_generator.generate_quizzes_from_doc,
+                doc,
+                num_questions=num_questions,
+                num_options=num_options
+            )
+            #logger.info(f"Número de quizzes generados: {len(quizzes)}")
+            # Lemas de spaCy para el índice de búsqueda del curso
+            search_lemmas = await run_in_threadpool(
+                quiz_generator.lemma_table, doc, quiz_texts(FilePath(file.filename).stem, quizzes)
+            )
+
+            storage_path = await storage_task
+        finally:
+            # El archivo temporal se cierra al terminar la petición:
+            # no responder mientras la subida siga leyéndolo
+            await _wait_quietly(storage_task)
+            if artifacts_task is not None:
+                await _wait_quietly(artifacts_task)
+
+        title = FilePath(file.filename).stem 
+    
+        # 4. Guardar en Firestore
+        try:
+            return await save_to_firestore(
+                course_id=course_id,
+                filename=file.filename,
+                file_path=storage_path,
+                quizzes= quizzes,
+                title= title,  # Añade este parámetro
+                content_hash=digest,
+                idempotency_key=idempotency_key,
+                search_lemmas=search_lemmas
+            )
+        except DuplicateUploadError:
+            # Otro proceso guardó el mismo contenido mientras tanto
+            existing_id = await run_in_threadpool(
+                find_existing_upload, course_id, digest, idempotency_key
+            )
+            return await get_document(course_id, existing_id)
+
 
 @router.post(
     "/",
@@ -23,7 +219,9 @@ router = APIRouter(prefix="/courses/{course_id}/documents", tags=["Documents"])
         200: {"description": "Documento procesado exitosamente"},
         400: {"description": "Formato de archivo no soportado"},
         422: {"description": "El documento no contiene suficiente texto"},
-        500: {"description": "Error interno del servidor"}
+        429: {"description": "Demasiadas subidas en espera para este curso/usuario"},
+        500: {"description": "Error interno del servidor"},
+        503: {"description": "Servidor ocupado, reintentar tras Retry-After"}
     }
 )
 async def upload_document_and_generate_questions(
@@ -40,6 +238,15 @@ async def upload_document_and_generate_questions(
         gt=2,
         le=5, 
         description="Número de opciones por pregunta (entre 2 y 5)"
+    ),
+    mode: GenerationMode = Form(
+        GenerationMode.QUALITY,
+        description="Pipeline de NLP: 'fast' (menor latencia) o 'quality'"
+    ),
+    user_id: Optional[str] = Depends(get_optional_user),
+    idempotency_key: Optional[str] = Header(
+        None,
+        description="Clave para reintentos seguros: la misma clave devuelve el mismo documento"
     )
 ):
     """
@@ -47,60 +254,54 @@ async def upload_document_and_generate_questions(
     
     Proceso:
     1. Valida el formato del archivo (PDF, DOCX, PPTX)
-    2. Extrae el texto del documento
+    2. Extrae el texto del documento (mientras el original se sube a Storage)
     3. Genera preguntas contextuales usando spaCy
     4. Almacena todo en Firestore con la estructura:
        - Documento principal
        - Quizzes (preguntas)
        - Options (opciones de respuesta)
     Devuelve el documento creado con todas sus preguntas y opciones.
+
+    Si el mismo archivo ya se subió a este curso (o se repite la cabecera
+    Idempotency-Key) se devuelve el documento existente sin re-procesarlo.
     
     """
     try:
         # 1. Validar formato
-        file_extension = FilePath(file.filename).suffix.lower()
-        valid_extensions = ['.pdf', '.docx', '.pptx']
+        file_extension = _validate_extension(file.filename)
 
         #logger.info(f"Procesando archivo: {file.filename}")
         #logger.info(f"Tamaño del archivo: {file.size} bytes")
         
-        if file_extension not in valid_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Formato {file_extension} no soportado. Use: {', '.join(valid_extensions)}"
-            )
-        
-        # 2. Extraer texto
-        try:
-            text = await extract_text_from_file(file, file_extension) #es una función asíncrona (coroutine)
-            if len(text.split()) < 30:  # Mínimo 30 palabras
-                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,detail="El documento no contiene suficiente texto")
-        except ValueError as e:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail= str(e)) 
-        
-        #logger.info(f"Texto extraído (primeros 100 chars): {text[:100]}") 
-        # 3. Generar quizzes
-        quizzes = quiz_generator.generate_quizzes(
-            text=text,
-            num_questions=num_questions,
-            num_options=num_options
-        )
-        #logger.info(f"Número de quizzes generados: {len(quizzes)}")
+        content = await file.read()
+        digest = content_hash(content)
 
-        title = FilePath(file.filename).stem 
-        
-        # 4. Guardar en Firestore
-        return await save_to_firestore(
-            course_id=course_id,
-            filename=file.filename,
-            file_path=f"uploads/{file.filename}",
-            quizzes= quizzes,
-            title= title  # Añade este parámetro
+        # Subidas idénticas concurrentes esperan a la que ya está en curso
+        return await upload_flights.run(
+            f"{course_id}:{digest}",
+            lambda: _process_upload(
+                course_id=course_id,
+                file=file,
+                content=content,
+                digest=digest,
+                file_extension=file_extension,
+                num_questions=num_questions,
+                num_options=num_options,
+                mode=mode,
+                user_id=user_id,
+                idempotency_key=idempotency_key
+            )
         )
         
     except HTTPException as he:
         # Re-lanzar excepciones HTTP que ya fueron lanzadas
         raise he
+    except AdmissionRejected as ar:
+        raise HTTPException(
+            status_code=ar.status_code,
+            detail=ar.detail,
+            headers={"Retry-After": str(ar.retry_after)}
+        )
     except ValueError as ve:
         # Para errores de validación de contenido
         raise HTTPException(
@@ -115,19 +316,346 @@ async def upload_document_and_generate_questions(
         )
     
 
+@router.post(
+    "/quizzes/batch",
+    response_model=Dict[str, List[QuizResponse]],
+    summary="Obtener preguntas de varios documentos en una sola petición"
+)
+async def get_quizzes_for_documents(
+    request: BatchQuizRequest,
+    course_id: str = Path(..., description="ID del curso")
+):
+    """
+    Devuelve las preguntas de cada documento indicado, agrupadas por ID de
+    documento. Las lecturas se hacen en paralelo (con límite de concurrencia).
+    """
+    try:
+        return await get_quizzes_by_documents(course_id, request.document_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.get(
     "/{document_id}/quizzes",
     response_model=List[QuizResponse],
-    summary="Obtener preguntas generadas de un documento"
+    summary="Obtener preguntas generadas de un documento",
+    responses={304: {"description": "Sin cambios respecto al ETag enviado"}}
 )
 async def get_document_quizzes(
+    response: Response,
     course_id: str = Path(..., description="ID del curso"),
-    document_id: str = Path(..., description="ID del documento")
+    document_id: str = Path(..., description="ID del documento"),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Devuelve todas las preguntas generadas para un documento específico.
+    Responde 304 si If-None-Match coincide con la versión actual, sin leer
+    las subcolecciones de quizzes ni opciones.
     """
     try:
+        etag = await run_in_threadpool(get_quizzes_etag, course_id, document_id)
+        if etag is not None:
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+            response.headers.update(cache_headers(etag))
         return await get_quizzes_by_document(course_id, document_id)
     except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def _load_chunk_docs(digest: str, mode: GenerationMode) -> Optional[list]:
+    """Docs por fragmento guardados para este contenido y pipeline, o None."""
+    doc_bytes = load_doc_artifact(digest, pipeline_id(mode))
+    if doc_bytes is None:
+        return None
+    return deserialize_docs(doc_bytes, mode)
+
+
+def _load_parsed_doc(digest: str, mode: GenerationMode):
+    """
+    Recupera el Doc analizado del documento desde sus artefactos.
+    Si no hay Docs serializados para este pipeline se re-analiza el texto
+    guardado (sin volver a extraerlo del archivo).
+    """
+    chunk_docs = _load_chunk_docs(digest, mode)
+    if chunk_docs:
+        return combine_docs(chunk_docs)
+
+    text = load_text_artifact(digest)
+    if text is None:
+        raise ValueError("El documento no tiene texto guardado; vuelva a subir el archivo")
+    doc = quiz_generator.parse(text, mode)
+    if STORE_PARSED_DOC:
+        try:
+            save_doc_artifact(digest, pipeline_id(mode), serialize_docs([doc]))
+        except Exception:
+            logger.exception("No se pudo guardar el Doc de %s", digest)
+    return doc
+
+
+@router.post(
+    "/{document_id}/regenerate",
+    response_model=DocumentResponse,
+    summary="Regenerar preguntas de un documento ya subido"
+)
+async def regenerate_document_quizzes(
+    request: RegenerateRequest,
+    course_id: str = Path(..., description="ID del curso"),
+    document_id: str = Path(..., description="ID del documento"),
+    user_id: Optional[str] = Depends(get_optional_user)
+):
+    """
+    Reemplaza las preguntas de un documento usando el texto y el Doc de
+    spaCy guardados al subirlo: no se vuelve a extraer el texto ni, si el
+    Doc está disponible, a analizarlo.
+    """
+    try:
+        try:
+            metadata = await run_in_threadpool(get_document_metadata, course_id, document_id)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+        digest = metadata.get("contentHash")
+        if not digest:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="El documento no tiene artefactos guardados; vuelva a subir el archivo"
+            )
+
+        mode = request.mode
+        async with upload_admission.slot(_admission_key(course_id, user_id)):
+            doc = await run_in_threadpool(_load_parsed_doc, digest, mode)
+            quizzes = await run_in_threadpool(
+                quiz_generator.generate_quizzes_from_doc,
+                doc,
+                num_questions=request.num_questions,
+                num_options=request.num_options,
+                seed=request.seed
+            )
+            search_lemmas = await run_in_threadpool(
+                quiz_generator.lemma_table, doc, quiz_texts(metadata.get("title", ""), quizzes)
+            )
+        response = await replace_quizzes(
+            course_id,
+            document_id,
+            quizzes,
+            document_fields={"searchLemmas": search_lemmas}
+        )
+        answer_keys.invalidate(course_id, document_id)
+        return response
+
+    except HTTPException as he:
+        raise he
+    except AdmissionRejected as ar:
+        raise HTTPException(
+            status_code=ar.status_code,
+            detail=ar.detail,
+            headers={"Retry-After": str(ar.retry_after)}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
+@router.put(
+    "/{document_id}/completion",
+    summary="Marcar un documento como completado"
+)
+async def set_document_completion(
+    request: CompletionRequest,
+    course_id: str = Path(..., description="ID del curso"),
+    document_id: str = Path(..., description="ID del documento")
+):
+    """
+    Cambia ``completed`` del documento y, en la misma transacción, el
+    contador de documentos completados del curso.
+    """
+    try:
+        return await run_in_threadpool(set_document_completed, course_id, document_id, request.completed)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.put(
+    "/{document_id}",
+    response_model=DocumentResponse,
+    summary="Subir una versión revisada de un documento",
+    responses={
+        400: {"description": "Formato de archivo no soportado"},
+        404: {"description": "Documento no encontrado"},
+        409: {"description": "El nuevo contenido ya existe en otro documento del curso"},
+        422: {"description": "El documento no contiene suficiente texto"},
+        503: {"description": "Servidor ocupado, reintentar tras Retry-After"}
+    }
+)
+async def revise_document(
+    course_id: str = Path(..., description="ID del curso"),
+    document_id: str = Path(..., description="ID del documento"),
+    file: UploadFile = File(..., description="Nueva versión en formato PDF, DOCX o PPTX"),
+    num_questions: Optional[int] = Form(
+        None,
+        gt=1,
+        le=20,
+        description="Total de preguntas tras la revisión (por defecto, las actuales)"
+    ),
+    num_options: int = Form(
+        4,
+        gt=2,
+        le=5,
+        description="Número de opciones de las preguntas nuevas"
+    ),
+    mode: GenerationMode = Form(
+        GenerationMode.QUALITY,
+        description="Pipeline de NLP: 'fast' (menor latencia) o 'quality'"
+    ),
+    user_id: Optional[str] = Depends(get_optional_user)
+):
+    """
+    Reprocesa incrementalmente una versión revisada del documento.
+
+    El texto se divide en páginas, párrafos o diapositivas con una huella
+    por fragmento. Sólo se analizan con spaCy los fragmentos que cambiaron
+    respecto a la versión anterior; los demás se toman de los Docs
+    guardados. Las preguntas cuyo contexto sigue presente en el documento
+    se conservan y sólo se generan las que faltan, a partir de los
+    fragmentos modificados.
+    """
+    try:
+        file_extension = _validate_extension(file.filename)
+        try:
+            metadata = await run_in_threadpool(get_document_metadata, course_id, document_id)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+        content = await file.read()
+        digest = content_hash(content)
+        previous_digest = metadata.get("contentHash")
+        if digest == previous_digest:
+            # Mismo contenido: no hay nada que reprocesar
+            return await get_document(course_id, document_id)
+
+        async with upload_admission.slot(_admission_key(course_id, user_id)):
+            # Validar el texto antes de subir el original a Storage
+            chunks = await run_in_threadpool(_extract_chunks, content, file_extension)
+            storage_task = asyncio.ensure_future(run_in_threadpool(
+                upload_original, file.file, digest, file_extension, file.content_type
+            ))
+            artifacts_task = None
+            try:
+                previous_docs = []
+                if previous_digest:
+                    previous_docs = await run_in_threadpool(
+                        _load_chunk_docs, previous_digest, mode
+                    ) or []
+
+                # Sólo se analizan los fragmentos nuevos o modificados
+                chunk_docs, changed_docs = await run_in_threadpool(
+                    _parse_chunks, chunks, previous_docs, mode
+                )
+                doc = await run_in_threadpool(combine_docs, chunk_docs)
+                artifacts_task = asyncio.ensure_future(run_in_threadpool(
+                    _store_artifacts, digest, "\n".join(chunks), chunk_docs, mode
+                ))
+
+                # Se conservan las preguntas cuyo contexto no cambió
+                existing_quizzes = await get_quizzes_by_document(course_id, document_id)
+                target = num_questions or metadata.get("numQuestions") or len(existing_quizzes)
+                kept_quizzes = [
+                    quiz for quiz in existing_quizzes
+                    if quiz.context and quiz.context in doc.text
+                ][:target]
+
+                missing = target - len(kept_quizzes)
+                new_quizzes = []
+                if missing > 0:
+                    new_quizzes = await run_in_threadpool(
+                        quiz_generator.generate_quizzes_from_doc,
+                        doc,
+                        num_questions=missing,
+                        num_options=num_options,
+                        source_docs=changed_docs or None
+                    )
+                search_lemmas = await run_in_threadpool(
+                    quiz_generator.lemma_table,
+                    doc,
+                    quiz_texts(metadata.get("title", ""), kept_quizzes + new_quizzes)
+                )
+
+                storage_path = await storage_task
+            finally:
+                await _wait_quietly(storage_task)
+                if artifacts_task is not None:
+                    await _wait_quietly(artifacts_task)
+
+        response = await replace_quizzes(
+            course_id,
+            document_id,
+            new_quizzes,
+            kept_quizzes=kept_quizzes,
+            document_fields={
+                "contentHash": digest,
+                "storagePath": storage_path,
+                "originalName": file.filename,
+                "fileType": file_extension[1:],
+                "searchLemmas": search_lemmas
+            }
+        )
+        answer_keys.invalidate(course_id, document_id)
+        return response
+
+    except HTTPException as he:
+        raise he
+    except AdmissionRejected as ar:
+        raise HTTPException(
+            status_code=ar.status_code,
+            detail=ar.detail,
+            headers={"Retry-After": str(ar.retry_after)}
+        )
+    except DuplicateUploadError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error interno al procesar documento: {str(e)}"
+        )
+
+
+@router.post(
+    "/{document_id}/quizzes/import",
+    summary="Importar preguntas en bloque (NDJSON o arreglo JSON)",
+    responses={
+        404: {"description": "Documento no encontrado"},
+        415: {"description": "Use application/x-ndjson o application/json"}
+    }
+)
+async def import_document_quizzes(
+    request: Request,
+    course_id: str = Path(..., description="ID del curso"),
+    document_id: str = Path(..., description="ID del documento")
+):
+    """
+    Importa preguntas de otros sistemas sin pasar por el NLP.
+
+    El cuerpo se lee como stream: NDJSON (``application/x-ndjson``, un
+    QuizCreate por línea) o un arreglo JSON (``application/json``). Cada
+    registro se valida por separado y los válidos se escriben en batches.
+    Devuelve cuántos se importaron, los errores por registro y el ritmo.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        records = iter_ndjson(request.stream())
+    elif content_type == "application/json":
+        records = iter_json_array(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use application/x-ndjson o application/json"
+        )
+
+    try:
+        report = await import_quizzes(course_id, document_id, records)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    answer_keys.invalidate(course_id, document_id)
+    return report
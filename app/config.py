@@ -0,0 +1,87 @@
+import os
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+def _env_list(name: str, default: str) -> list:
+    """Lee una variable de entorno separada por comas como lista."""
+    value = os.getenv(name, default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# --- spaCy ---
+# Modelo usado en modo "quality" (es_core_news_sm | es_core_news_md | es_core_news_lg)
+SPACY_MODEL = os.getenv("SPACY_MODEL", "es_core_news_lg")
+# Modelo usado en modo "fast" (subidas sensibles a la latencia)
+SPACY_FAST_MODEL = os.getenv("SPACY_FAST_MODEL", "es_core_news_sm")
+# Componentes que no se cargan. El generador sólo usa ents, noun_chunks,
+# POS/lemma y oraciones, así que por defecto no se excluye nada obligatorio.
+SPACY_EXCLUDE = _env_list("SPACY_EXCLUDE", "")
+# En modo "fast" se omite además el NER: las frases clave salen de
+# noun_chunks y verbos, que sólo necesitan parser y morfología.
+SPACY_FAST_EXCLUDE = _env_list("SPACY_FAST_EXCLUDE", "ner")
+
+# --- Arranque ---
+# Carga en segundo plano del modelo y de Firebase al iniciar el servidor.
+# /readyz responde 503 hasta que termina.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Modos de generación a precargar durante el calentamiento
+WARMUP_MODES = _env_list("WARMUP_MODES", "quality")
+
+# --- Control de admisión de subidas ---
+# Subidas procesándose a la vez (extracción + NLP)
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", str(os.cpu_count() or 2)))
+# Subidas en espera antes de responder 503
+UPLOAD_MAX_QUEUE = int(os.getenv("UPLOAD_MAX_QUEUE", "16"))
+# Segundos máximos en cola antes de responder 503
+UPLOAD_QUEUE_TIMEOUT = float(os.getenv("UPLOAD_QUEUE_TIMEOUT", "30"))
+# Reparto equitativo de la cola: "none", "course" o "user"
+UPLOAD_FAIRNESS = os.getenv("UPLOAD_FAIRNESS", "none").lower()
+# Subidas en espera por curso/usuario antes de responder 429
+UPLOAD_MAX_QUEUE_PER_KEY = int(os.getenv("UPLOAD_MAX_QUEUE_PER_KEY", "4"))
+
+# --- Storage ---
+# Tamaño de cada fragmento de la subida resumible (múltiplo de 256 KB)
+STORAGE_CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE", str(8 * 1024 * 1024)))
+# Guardar el Doc de spaCy serializado junto al texto extraído, para poder
+# regenerar quizzes sin volver a analizar el documento
+STORE_PARSED_DOC = os.getenv("STORE_PARSED_DOC", "true").lower() in ("1", "true", "yes")
+
+# --- Lecturas concurrentes ---
+# Lecturas de Firestore simultáneas al exportar un curso
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "16"))
+# Lecturas de Firestore simultáneas al obtener quizzes de varios documentos
+BATCH_READ_CONCURRENCY = int(os.getenv("BATCH_READ_CONCURRENCY", "16"))
+
+# --- Importación masiva de quizzes ---
+# Batches de Firestore confirmándose a la vez
+IMPORT_MAX_INFLIGHT_BATCHES = int(os.getenv("IMPORT_MAX_INFLIGHT_BATCHES", "4"))
+# Errores por registro incluidos en el reporte (el resto sólo se cuenta)
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "100"))
+
+# --- Respuestas ---
+# Comprimir con gzip las respuestas grandes (si el cliente lo acepta)
+RESPONSE_GZIP = os.getenv("RESPONSE_GZIP", "true").lower() in ("1", "true", "yes")
+# Tamaño mínimo (bytes) para comprimir una respuesta
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+
+# --- Intentos de estudiantes ---
+# Intentos en memoria que disparan una escritura anticipada a Firestore
+ATTEMPT_FLUSH_SIZE = int(os.getenv("ATTEMPT_FLUSH_SIZE", "200"))
+# Segundos máximos que un intento espera en memoria antes de escribirse
+ATTEMPT_FLUSH_INTERVAL = float(os.getenv("ATTEMPT_FLUSH_INTERVAL", "1.0"))
+# Intentos en memoria a partir de los cuales las peticiones esperan la escritura
+ATTEMPT_MAX_PENDING = int(os.getenv("ATTEMPT_MAX_PENDING", "5000"))
+# Fragmentos (shards) de los contadores por quiz
+ATTEMPT_STATS_SHARDS = int(os.getenv("ATTEMPT_STATS_SHARDS", "10"))
+# Segundos que se guardan en memoria las respuestas correctas de un documento
+ANSWER_KEY_TTL = float(os.getenv("ANSWER_KEY_TTL", "300"))
+
+# --- Búsqueda ---
+# Segundos hasta reconstruir el índice de un curso desde Firestore (recoge
+# cambios hechos por otros workers)
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "600"))
+# Cursos con índice en memoria por worker (se descartan los menos usados)
+SEARCH_MAX_COURSES = int(os.getenv("SEARCH_MAX_COURSES", "200"))
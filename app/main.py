@@ -1,6 +1,16 @@
-from fastapi import FastAPI
-from app.api import courses, auth, documents,users # Importa tus rutas
+import logging
+import threading
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api import courses, auth, documents, users, attempts # Importa tus rutas
+from app.config import WARMUP_ON_STARTUP, WARMUP_MODES, RESPONSE_GZIP, GZIP_MINIMUM_SIZE
+from app.services import firebase, npl_service
+from app.services.admission import upload_admission
+from app.services.attempt_service import attempt_buffer
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Plataforma de Cursos")
 
@@ -11,13 +21,79 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
+# Compresión de respuestas grandes (listas de quizzes, exportaciones)
+if RESPONSE_GZIP:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(courses.router)
 app.include_router(documents.router)
+app.include_router(attempts.router)
+
+
+def _warm_up():
+    """Inicializa Firebase y los modelos de spaCy sin bloquear el arranque."""
+    try:
+        firebase.get_db()
+        firebase.get_bucket()
+        for mode in WARMUP_MODES:
+            npl_service.warm_up(mode)
+        logger.info("Calentamiento completado")
+    except Exception:
+        logger.exception("Error durante el calentamiento")
+
+
+@app.on_event("startup")
+def start_warm_up():
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
+
+@app.on_event("startup")
+async def start_attempt_buffer():
+    attempt_buffer.start()
+
+
+@app.on_event("shutdown")
+async def flush_attempt_buffer():
+    """Escribe los intentos que quedan en memoria antes de terminar."""
+    await attempt_buffer.stop()
+
 
 @app.get("/")
 def home():
-    return {"message": "¡Bienvenido a la API!"}
\ No newline at end of file
+    return {"message": "¡Bienvenido a la API!"}
+
+
+@app.get("/healthz", tags=["Health"])
+def healthz():
+    """Liveness: el proceso está vivo y atiende peticiones."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", tags=["Health"])
+def readyz():
+    """
+    Readiness: el modelo de NLP y Firebase están cargados. Sin calentamiento
+    (WARMUP_ON_STARTUP=false) se cargan con la primera petición que los use,
+    así que el servicio se declara listo desde el arranque.
+    """
+    checks = {
+        "firebase": firebase.is_ready(),
+        **{f"nlp_{mode}": npl_service.is_ready(mode) for mode in WARMUP_MODES},
+    }
+    ready = all(checks.values()) or not WARMUP_ON_STARTUP
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "starting", "checks": checks}
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+def metrics():
+    """Métricas de la cola de subidas y de los intentos en formato Prometheus."""
+    return upload_admission.render_metrics() + attempt_buffer.render_metrics()
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field, conlist, validator
+
+
+class AttemptAnswer(BaseModel):
+    quiz_id: str = Field(..., alias="quizId")
+    option_id: str = Field(..., alias="optionId")
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class AttemptSubmission(BaseModel):
+    answers: conlist(AttemptAnswer, min_items=1, max_items=100)
+
+    @validator("answers")
+    def one_answer_per_quiz(cls, answers):
+        # Cada respuesta suma a los contadores del quiz: no se permiten repetidas
+        quiz_ids = [answer.quiz_id for answer in answers]
+        if len(set(quiz_ids)) != len(quiz_ids):
+            raise ValueError("Cada quiz puede responderse una sola vez por intento")
+        return answers
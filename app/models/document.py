@@ -1,7 +1,8 @@
 from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from .quiz import QuizResponse
+from app.services.npl_service import GenerationMode
 
 class DocumentBase(BaseModel):
     title: str
@@ -19,4 +20,13 @@ class DocumentResponse(DocumentBase):
     quizzes: List[QuizResponse] = Field(default_factory=list)
     
     class Config:
-        allow_population_by_field_name = True
\ No newline at end of file
+        allow_population_by_field_name = True
+
+class RegenerateRequest(BaseModel):
+    num_questions: int = Field(5, gt=1, le=20, description="Número de preguntas a generar")
+    num_options: int = Field(4, gt=2, le=5, description="Número de opciones por pregunta")
+    seed: Optional[int] = Field(None, description="Semilla para obtener preguntas reproducibles")
+    mode: GenerationMode = Field(GenerationMode.QUALITY, description="Pipeline de NLP si hay que re-analizar")
+
+class CompletionRequest(BaseModel):
+    completed: bool = Field(..., description="Marca el documento como completado o pendiente")
@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, conlist
 from typing import List
 from .option import OptionBase, OptionResponse
 
@@ -28,4 +28,11 @@ class QuizResponse(QuizBase):
         allow_population_by_field_name = True
         json_encoders = {
             datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+class BatchQuizRequest(BaseModel):
+    document_ids: conlist(str, min_items=1, max_items=100) = Field(..., alias="documentIds")
+
+    class Config:
+        allow_population_by_field_name = True
@@ -0,0 +1,201 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+from app.config import (
+    UPLOAD_MAX_CONCURRENCY,
+    UPLOAD_MAX_QUEUE,
+    UPLOAD_QUEUE_TIMEOUT,
+    UPLOAD_MAX_QUEUE_PER_KEY
+)
+
+
+# Clave común cuando no hay reparto equitativo: sólo aplica el límite global
+GLOBAL_KEY = "global"
+
+
+class AdmissionRejected(Exception):
+    """La petición no fue admitida: la cola está llena o se agotó la espera."""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionController:
+    """
+    Limita cuántas tareas pesadas corren a la vez.
+
+    Hasta ``max_concurrency`` tareas se ejecutan en paralelo y hasta
+    ``max_queue`` esperan turno. Los turnos se reparten en round-robin entre
+    claves (curso o usuario), así una sola clave no acapara la cola; cada
+    clave puede tener como máximo ``max_queue_per_key`` peticiones en espera
+    (salvo GLOBAL_KEY, que representa a todas las peticiones).
+
+    - Cola global llena o espera agotada -> 503
+    - Cola de la clave llena -> 429
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        max_queue_per_key: Optional[int] = None
+    ):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.max_queue_per_key = max_queue_per_key or self.max_queue
+        self._active = 0
+        self._queued = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        # Tiempo medio de servicio (media móvil) para estimar Retry-After
+        self._avg_service = 1.0
+        # Métricas
+        self.admitted_total = 0
+        self.rejected_total: Dict[str, int] = {"queue_full": 0, "key_queue_full": 0, "timeout": 0}
+        self.wait_seconds_sum = 0.0
+        self.wait_seconds_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @asynccontextmanager
+    async def slot(self, key: str = GLOBAL_KEY):
+        """Ocupa un turno mientras dura el bloque ``async with``."""
+        await self._acquire(key)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self._avg_service = 0.8 * self._avg_service + 0.2 * elapsed
+            self._release()
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que se libere un turno."""
+        waves = (self._queued + 1) / self.max_concurrency
+        return max(1, math.ceil(waves * self._avg_service))
+
+    async def _acquire(self, key: str):
+        start = time.monotonic()
+        if self._active < self.max_concurrency and self._queued == 0:
+            self._active += 1
+            self._record_wait(0.0)
+            return
+
+        if self._queued >= self.max_queue:
+            self._reject("queue_full", 503, "Servidor ocupado, intente más tarde")
+
+        waiters = self._waiters.get(key)
+        if key != GLOBAL_KEY and waiters is not None and len(waiters) >= self.max_queue_per_key:
+            self._reject("key_queue_full", 429, "Demasiadas subidas en espera para este recurso")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        self._queued += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._abandon(key, future):
+                self._reject("timeout", 503, "Tiempo de espera agotado en la cola")
+        except asyncio.CancelledError:
+            # El cliente se desconectó: si ya tenía turno, se libera
+            if self._abandon(key, future):
+                self._release()
+            raise
+
+        self._record_wait(time.monotonic() - start)
+
+    def _abandon(self, key: str, future: asyncio.Future) -> bool:
+        """
+        Saca una petición de la cola. Devuelve True si ya se le había
+        concedido el turno (y por tanto lo tiene ocupado).
+        """
+        if future.done():
+            if not future.cancelled():
+                # El turno llegó justo al vencer el plazo: se conserva
+                return True
+            return False
+        future.cancel()
+        waiters = self._waiters.get(key)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiters[key]
+        return False
+
+    def _release(self):
+        self._active -= 1
+        self._grant_next()
+
+    def _grant_next(self):
+        while self._active < self.max_concurrency and self._waiters:
+            # Round-robin: se atiende la primera clave y se pasa al final
+            key, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+
+    def _record_wait(self, waited: float):
+        self.admitted_total += 1
+        self.wait_seconds_sum += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def _reject(self, reason: str, status_code: int, detail: str):
+        self.rejected_total[reason] += 1
+        raise AdmissionRejected(status_code, self.retry_after(), detail)
+
+    def render_metrics(self) -> str:
+        """Métricas en formato de exposición de Prometheus."""
+        prefix = f"{self.name}_admission"
+        lines = [
+            f"# TYPE {prefix}_queue_depth gauge",
+            f"{prefix}_queue_depth {self._queued}",
+            f"# TYPE {prefix}_active gauge",
+            f"{prefix}_active {self._active}",
+            f"# TYPE {prefix}_admitted_total counter",
+            f"{prefix}_admitted_total {self.admitted_total}",
+            f"# TYPE {prefix}_rejected_total counter",
+            *[
+                f'{prefix}_rejected_total{{reason="{reason}"}} {count}'
+                for reason, count in self.rejected_total.items()
+            ],
+            f"# TYPE {prefix}_wait_seconds summary",
+            f"{prefix}_wait_seconds_sum {self.wait_seconds_sum:.6f}",
+            f"{prefix}_wait_seconds_count {self.admitted_total}",
+            f"# TYPE {prefix}_wait_seconds_max gauge",
+            f"{prefix}_wait_seconds_max {self.wait_seconds_max:.6f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+# Instancia global para el endpoint de subida de documentos
+upload_admission = AdmissionController(
+    name="upload",
+    max_concurrency=UPLOAD_MAX_CONCURRENCY,
+    max_queue=UPLOAD_MAX_QUEUE,
+    queue_timeout=UPLOAD_QUEUE_TIMEOUT,
+    max_queue_per_key=UPLOAD_MAX_QUEUE_PER_KEY
+)
@@ -0,0 +1,354 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from google.cloud import firestore
+from starlette.concurrency import run_in_threadpool
+from app.config import (
+    ATTEMPT_FLUSH_SIZE,
+    ATTEMPT_FLUSH_INTERVAL,
+    ATTEMPT_MAX_PENDING,
+    ATTEMPT_STATS_SHARDS,
+    ANSWER_KEY_TTL
+)
+from app.models.attempt import AttemptAnswer
+from app.services.firebase import get_db
+from app.services.idempotency import InFlightRegistry
+
+logger = logging.getLogger(__name__)
+
+# Límite de operaciones por batch de Firestore
+MAX_BATCH_OPERATIONS = 500
+# Espera antes de reintentar escrituras fallidas (se duplica hasta el máximo)
+RETRY_BACKOFF_INITIAL = 1.0
+RETRY_BACKOFF_MAX = 60.0
+
+# quiz_id -> {option_id -> is_correct}, con todas las opciones del quiz
+AnswerKey = Dict[str, Dict[str, bool]]
+
+
+def _document_path(course_id: str, document_id: str) -> str:
+    return f"courses/{course_id}/documents/{document_id}"
+
+
+def _load_answer_key(course_id: str, document_id: str) -> AnswerKey:
+    """Lee de Firestore las opciones de cada quiz del documento y cuáles son correctas."""
+    doc_ref = get_db().document(_document_path(course_id, document_id))
+    answer_key = {}
+    for quiz_doc in doc_ref.collection("quizzes").stream():
+        options = quiz_doc.reference.collection("options").select(["is_correct"]).stream()
+        answer_key[quiz_doc.id] = {
+            option_doc.id: bool(option_doc.to_dict().get("is_correct"))
+            for option_doc in options
+        }
+    return answer_key
+
+
+class AnswerKeyCache:
+    """
+    Respuestas correctas por documento, en memoria durante ``ttl`` segundos.
+    Calificar un intento no lee Firestore salvo la primera vez; si muchos
+    estudiantes envían a la vez con la caché fría, sólo una lectura va a
+    Firestore y el resto la espera.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str, str], AnswerKey] = _load_answer_key,
+        ttl: float = ANSWER_KEY_TTL
+    ):
+        self._loader = loader
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, str], Tuple[float, AnswerKey]] = {}
+        self._loads = InFlightRegistry()
+
+    async def get(self, course_id: str, document_id: str, refresh: bool = False) -> AnswerKey:
+        key = (course_id, document_id)
+        entry = self._entries.get(key)
+        if entry is not None and not refresh and entry[0] > time.monotonic():
+            return entry[1]
+
+        async def load() -> AnswerKey:
+            answer_key = await run_in_threadpool(self._loader, course_id, document_id)
+            self._entries[key] = (time.monotonic() + self.ttl, answer_key)
+            return answer_key
+
+        return await self._loads.run(f"{course_id}:{document_id}", load)
+
+    def invalidate(self, course_id: str, document_id: str):
+        """Descarta las respuestas guardadas (tras regenerar, revisar o importar quizzes)."""
+        self._entries.pop((course_id, document_id), None)
+
+
+async def grade_answers(
+    course_id: str,
+    document_id: str,
+    answers: List[AttemptAnswer],
+    answer_keys: "AnswerKeyCache"
+) -> List[Dict[str, Any]]:
+    """
+    Califica cada respuesta contra ``is_correct``. Si aparece un quiz o una
+    opción que no está en caché (p. ej. recién regenerado) se vuelve a leer
+    una vez; una opción que no es del quiz rechaza el intento.
+    """
+    def known(answer_key: AnswerKey, answer: AttemptAnswer) -> bool:
+        return answer.option_id in answer_key.get(answer.quiz_id, {})
+
+    answer_key = await answer_keys.get(course_id, document_id)
+    if not all(known(answer_key, answer) for answer in answers):
+        answer_key = await answer_keys.get(course_id, document_id, refresh=True)
+
+    graded = []
+    for answer in answers:
+        options = answer_key.get(answer.quiz_id)
+        if options is None:
+            raise ValueError(f"Quiz no encontrado: {answer.quiz_id}")
+        if answer.option_id not in options:
+            raise ValueError(f"Opción no encontrada en el quiz {answer.quiz_id}: {answer.option_id}")
+        graded.append({
+            "quizId": answer.quiz_id,
+            "optionId": answer.option_id,
+            "correct": options[answer.option_id]
+        })
+    return graded
+
+
+class AttemptBuffer:
+    """
+    Acumula intentos en memoria y los escribe en batches de Firestore.
+
+    Cada flush escribe un documento por intento en
+    ``courses/{c}/attempts/{id}`` y, por cada quiz respondido, un único
+    ``Increment`` con la suma de respuestas y aciertos de todos los intentos
+    acumulados, sobre uno de ``shards`` documentos elegido al azar en
+    ``.../quizzes/{q}/statsShards``. Así un quiz en vivo con cientos de
+    estudiantes no concentra las escrituras en un solo documento.
+
+    Se escribe cada ``flush_interval`` segundos o antes si hay
+    ``flush_size`` intentos en espera. Con ``max_pending`` intentos en
+    memoria (contando las operaciones por reintentar) las nuevas peticiones
+    esperan a que termine una escritura.
+
+    Las escrituras fallidas no se descartan: se reintentan tras una espera
+    que se duplica con cada fallo seguido (hasta ``RETRY_BACKOFF_MAX``
+    segundos). Si Firestore sigue caído, el límite ``max_pending`` frena
+    las peticiones nuevas. Lo que está en memoria se pierde si el proceso
+    termina de forma abrupta.
+    """
+
+    def __init__(
+        self,
+        db_provider: Callable[[], Any] = get_db,
+        flush_size: int = ATTEMPT_FLUSH_SIZE,
+        flush_interval: float = ATTEMPT_FLUSH_INTERVAL,
+        max_pending: int = ATTEMPT_MAX_PENDING,
+        shards: int = ATTEMPT_STATS_SHARDS
+    ):
+        self._db_provider = db_provider
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.flush_size, max_pending)
+        self.shards = max(1, shards)
+        self._pending: List[Dict[str, Any]] = []
+        # Operaciones de batches fallidos: (ruta, datos)
+        self._retry: List[Tuple[str, Dict[str, Any]]] = []
+        # Momento (time.monotonic) a partir del cual se reintentan
+        self._retry_at = 0.0
+        self._retry_delay = 0.0
+        self._flush_lock = asyncio.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Métricas
+        self.flushes_total = 0
+        self.writes_total = 0
+        self.failed_writes_total = 0
+
+    @property
+    def pending(self) -> int:
+        """Intentos en memoria más operaciones por reintentar."""
+        return len(self._pending) + len(self._retry)
+
+    def start(self):
+        """Inicia la escritura periódica (llamar con el event loop en marcha)."""
+        if self._task is None:
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Detiene la escritura periódica y escribe lo pendiente."""
+        if self._task is not None:
+            # Sin cancelar: un flush en curso termina antes de salir
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush(retry_now=True)
+
+    async def add(
+        self,
+        course_id: str,
+        document_id: str,
+        user_id: str,
+        graded: List[Dict[str, Any]]
+    ) -> str:
+        """Encola un intento ya calificado y devuelve su id."""
+        while self.pending >= self.max_pending:
+            wait = self._retry_at - time.monotonic()
+            if not self._pending and wait > 0:
+                # Sólo quedan reintentos: esperar a que toque el siguiente
+                await asyncio.sleep(wait)
+            await self.flush()
+
+        attempt_id = uuid.uuid4().hex
+        self._pending.append({
+            "attemptId": attempt_id,
+            "courseId": course_id,
+            "documentId": document_id,
+            "userId": user_id,
+            "answers": graded,
+            "score": sum(1 for answer in graded if answer["correct"]),
+            "total": len(graded),
+            "submittedAt": datetime.utcnow()
+        })
+        if len(self._pending) >= self.flush_size and self._wake is not None:
+            self._wake.set()
+        return attempt_id
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                break
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Error al escribir intentos")
+
+    def _operations(self, attempts: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+        operations = []
+        # (ruta del quiz) -> [respuestas, aciertos], sumados entre intentos
+        counters: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for attempt in attempts:
+            data = dict(attempt)
+            attempt_id = data.pop("attemptId")
+            operations.append((f"courses/{data['courseId']}/attempts/{attempt_id}", data))
+            document_path = _document_path(data["courseId"], data["documentId"])
+            for answer in data["answers"]:
+                counter = counters[f"{document_path}/quizzes/{answer['quizId']}"]
+                counter[0] += 1
+                counter[1] += 1 if answer["correct"] else 0
+
+        now = datetime.utcnow()
+        for quiz_path, (answered, correct) in counters.items():
+            shard = random.randrange(self.shards)
+            operations.append((f"{quiz_path}/statsShards/{shard}", {
+                "attempts": firestore.Increment(answered),
+                "correct": firestore.Increment(correct),
+                "updatedAt": now
+            }))
+        return operations
+
+    def _commit(self, operations: List[Tuple[str, Dict[str, Any]]]):
+        db = self._db_provider()
+        batch = db.batch()
+        for path, data in operations:
+            # merge: los shards se crean con el primer Increment
+            batch.set(db.document(path), data, merge=True)
+        batch.commit()
+
+    async def flush(self, retry_now: bool = False) -> int:
+        """
+        Escribe los intentos pendientes y, si ya pasó la espera (o
+        ``retry_now``), los reintentos. Devuelve las operaciones escritas.
+        """
+        async with self._flush_lock:
+            attempts, self._pending = self._pending, []
+            operations = self._operations(attempts)
+            if self._retry and (retry_now or time.monotonic() >= self._retry_at):
+                operations = self._retry + operations
+                self._retry = []
+            if not operations:
+                return 0
+
+            chunks = [
+                operations[i:i + MAX_BATCH_OPERATIONS]
+                for i in range(0, len(operations), MAX_BATCH_OPERATIONS)
+            ]
+            results = await asyncio.gather(
+                *(run_in_threadpool(self._commit, chunk) for chunk in chunks),
+                return_exceptions=True
+            )
+
+            written = 0
+            failed = False
+            for chunk, result in zip(chunks, results):
+                if not isinstance(result, Exception):
+                    written += len(chunk)
+                    continue
+                logger.warning("No se pudo escribir un batch de intentos: %s", result)
+                # El batch es atómico: si falló no se aplicó nada y puede reintentarse
+                self._retry.extend(chunk)
+                self.failed_writes_total += len(chunk)
+                failed = True
+
+            if failed:
+                self._retry_delay = min(
+                    RETRY_BACKOFF_MAX, self._retry_delay * 2 or RETRY_BACKOFF_INITIAL
+                )
+                self._retry_at = time.monotonic() + self._retry_delay
+            elif not self._retry:
+                self._retry_delay = 0.0
+
+            self.flushes_total += 1
+            self.writes_total += written
+            return written
+
+    def render_metrics(self) -> str:
+        """Métricas en formato de exposición de Prometheus."""
+        lines = [
+            "# TYPE attempts_pending gauge",
+            f"attempts_pending {len(self._pending)}",
+            "# TYPE attempts_retry_operations gauge",
+            f"attempts_retry_operations {len(self._retry)}",
+            "# TYPE attempts_flushes_total counter",
+            f"attempts_flushes_total {self.flushes_total}",
+            "# TYPE attempts_writes_total counter",
+            f"attempts_writes_total {self.writes_total}",
+            "# TYPE attempts_failed_writes_total counter",
+            f"attempts_failed_writes_total {self.failed_writes_total}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def get_quiz_stats(course_id: str, document_id: str, quiz_id: str) -> Dict[str, Any]:
+    """
+    Suma los shards de estadísticas de un quiz. No incluye los intentos que
+    aún están en memoria (como mucho ``ATTEMPT_FLUSH_INTERVAL`` segundos).
+    """
+    quiz_ref = get_db().document(f"{_document_path(course_id, document_id)}/quizzes/{quiz_id}")
+    attempts = correct = 0
+    for shard in quiz_ref.collection("statsShards").stream():
+        data = shard.to_dict()
+        attempts += data.get("attempts", 0)
+        correct += data.get("correct", 0)
+    return {
+        "quizId": quiz_id,
+        "attempts": attempts,
+        "correct": correct,
+        "correctRate": round(correct / attempts, 4) if attempts else None
+    }
+
+
+# Instancias globales
+answer_keys = AnswerKeyCache()
+attempt_buffer = AttemptBuffer()
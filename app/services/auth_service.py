@@ -1,6 +1,7 @@
 from firebase_admin import auth
 from firebase_admin.exceptions import FirebaseError
 from typing import Optional
+from app.services.firebase import get_app
 
 class AuthService:
     
@@ -8,7 +9,7 @@ class AuthService:
     def get_user_by_id(uid: str):
         """Obtiene un usuario de Firebase por su UID"""
         try:
-            return auth.get_user(uid)
+            return auth.get_user(uid, app=get_app())
         except FirebaseError as e:
             raise ValueError(f"Error al obtener usuario: {str(e)}")
     
@@ -16,6 +17,6 @@ class AuthService:
     def verify_token(id_token: str) -> dict:
         """Verifica un token JWT de Firebase"""
         try:
-            return auth.verify_id_token(id_token)
+            return auth.verify_id_token(id_token, app=get_app())
         except FirebaseError as e:
             raise ValueError(f"Token inválido: {str(e)}")
\ No newline at end of file
@@ -2,8 +2,15 @@ from datetime import datetime
 from typing import List, Optional, Dict, Any
 from app.models.course import CourseCreate
 from app.models.course import CourseResponse
-from app.services.firebase import db
+from app.services.etag import make_etag
+from app.services.firebase import get_db
 from firebase_admin.exceptions import FirebaseError
+from google.cloud import firestore
+
+# Marca stats.countersVersion: los contadores del curso están completos.
+# Sólo la escriben create_course y backfill_course_stats; los Increment de
+# los batches no la crean, así un curso antiguo no pasa por migrado.
+COUNTERS_VERSION = 1
 
 class CourseService:
     
@@ -18,11 +25,19 @@ class CourseService:
                 **course_dict,
                 "ownerId": owner_id,
                 "createdAt": datetime.utcnow(),
-                "updatedAt": datetime.utcnow()
+                "updatedAt": datetime.utcnow(),
+                # Contadores que mantienen los batches de documentos
+                "stats": {
+                    "documentCount": 0,
+                    "completedCount": 0,
+                    "questionCount": 0,
+                    "documentsVersion": 0,
+                    "countersVersion": COUNTERS_VERSION
+                }
             }
             
             #2. Creamos el documento
-            doc_ref = db.collection("courses").document()
+            doc_ref = get_db().collection("courses").document()
             doc_ref.set(firestore_data)
             
             # 3. Retornar respuesta
@@ -77,7 +92,7 @@ class CourseService:
         """
         try:
             # 1. Obtener documentos base
-            courses_ref = db.collection("courses").where("ownerId", "==", user_id)
+            courses_ref = get_db().collection("courses").where("ownerId", "==", user_id)
             docs = courses_ref.stream()
             
             # 2. Construir respuesta manualmente (igual que en get_documents_by_course)
@@ -101,6 +116,114 @@ class CourseService:
         except Exception as e:
             raise ValueError(f"Error al obtener cursos: {str(e)}")
         
+    @staticmethod
+    def get_documents_etag(course_id: str) -> str:
+        """
+        ETag del listado de documentos de un curso. Sólo lee el documento del
+        curso: stats.documentsVersion cambia en cada batch que modifica
+        documentos y update_time con cualquier otra escritura del curso.
+        """
+        course_doc = get_db().collection("courses").document(course_id).get()
+        if not course_doc.exists:
+            raise ValueError("Curso no encontrado")
+        stats = course_doc.to_dict().get("stats", {})
+        return make_etag(
+            "documents",
+            course_id,
+            stats.get("documentsVersion", 0),
+            course_doc.update_time
+        )
+
+    @staticmethod
+    def _progress(stats: Dict[str, Any]) -> int:
+        total_docs = stats.get("documentCount", 0)
+        if total_docs <= 0:
+            return 0
+        return min(100, int((stats.get("completedCount", 0) / total_docs) * 100))
+
+    @staticmethod
+    def _count_documents(document_snapshots) -> Dict[str, int]:
+        """Contadores calculados recorriendo los documentos del curso."""
+        counters = {"documentCount": 0, "completedCount": 0, "questionCount": 0}
+        for doc in document_snapshots:
+            doc_data = doc.to_dict()
+            counters["documentCount"] += 1
+            counters["completedCount"] += 1 if doc_data.get("completed") else 0
+            counters["questionCount"] += doc_data.get("numQuestions", 0)
+        return counters
+
+    @staticmethod
+    def _has_counters(stats: Dict[str, Any]) -> bool:
+        return stats.get("countersVersion", 0) >= COUNTERS_VERSION
+
+    @staticmethod
+    def _course_stats(course_ref, course_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Contadores del curso (stats.documentCount, completedCount,
+        questionCount). Se mantienen con Increment en los mismos batches que
+        modifican documentos. Los cursos creados antes de existir se
+        calculan recorriendo sus documentos, sin escribir nada, hasta que se
+        migren con ``backfill_course_stats``.
+        """
+        stats = course_data.get("stats", {})
+        if CourseService._has_counters(stats):
+            return stats
+        return {**stats, **CourseService._count_documents(course_ref.collection("documents").stream())}
+
+    @staticmethod
+    def backfill_course_stats(course_id: str) -> Optional[Dict[str, int]]:
+        """
+        Inicializa los contadores de un curso anterior a ellos (migración).
+
+        Lee los documentos y escribe los totales en una transacción: si una
+        subida o un cambio de ``completed`` modifica el curso mientras tanto,
+        la transacción se reintenta y no se pierde su Increment. Los
+        contadores parciales que hayan creado esos Increment se reemplazan
+        por los totales. Devuelve None si el curso ya estaba migrado.
+        """
+        db = get_db()
+        course_ref = db.collection("courses").document(course_id)
+        documents_query = course_ref.collection("documents")
+
+        @firestore.transactional
+        def backfill(transaction) -> Optional[Dict[str, int]]:
+            course_doc = course_ref.get(transaction=transaction)
+            if not course_doc.exists:
+                raise ValueError("Curso no encontrado")
+            if CourseService._has_counters(course_doc.to_dict().get("stats", {})):
+                return None
+            counters = CourseService._count_documents(documents_query.get(transaction=transaction))
+            transaction.update(course_ref, {
+                **{f"stats.{name}": value for name, value in counters.items()},
+                "stats.countersVersion": COUNTERS_VERSION
+            })
+            return counters
+
+        return backfill(db.transaction())
+
+    @staticmethod
+    def get_course_summary(course_id: str) -> Dict[str, Any]:
+        """
+        Resumen del curso (documentos, completados, preguntas y progreso)
+        leyendo sólo el documento del curso.
+        """
+        course_ref = get_db().collection("courses").document(course_id)
+        course_doc = course_ref.get()
+        if not course_doc.exists:
+            raise ValueError("Curso no encontrado")
+
+        course_data = course_doc.to_dict()
+        stats = CourseService._course_stats(course_ref, course_data)
+        return {
+            "id": course_id,
+            "title": course_data.get("title", "Sin título"),
+            "documentCount": stats.get("documentCount", 0),
+            "completedCount": stats.get("completedCount", 0),
+            "questionCount": stats.get("questionCount", 0),
+            "progress": CourseService._progress(stats),
+            "lastUpdate": stats.get("lastUpdate")
+        }
+
     @staticmethod
     def get_documents_by_course(course_id: str) -> Dict[str, Any]:
         """
@@ -111,7 +234,7 @@ class CourseService:
         """
         try:
             # 1. Obtener datos básicos del curso
-            course_ref = db.collection("courses").document(course_id)
+            course_ref = get_db().collection("courses").document(course_id)
             course_doc = course_ref.get()
             
             if not course_doc.exists:
@@ -121,7 +244,7 @@ class CourseService:
             
             # 2. Obtener DOCUMENTOS del curso (desde subcolección 'documents')
             documents = []
-            docs_ref = course_ref.collection("documents").stream()  # Cambiado de 'modules' a 'documents'
+            docs_ref = list(course_ref.collection("documents").stream())  # Cambiado de 'modules' a 'documents'
             
             for doc in docs_ref:
                 doc_data = doc.to_dict()
@@ -135,13 +258,11 @@ class CourseService:
                     "locked": doc_data.get("locked", False)
                 })
 
-            # 3. Calcular progreso global del curso
-            total_docs = len(documents)
-            if total_docs > 0:
-                completed_docs = sum(1 for d in documents if d.get("completed"))
-                progress = int((completed_docs / total_docs) * 100)
-            else:
-                progress = 0
+            # 3. Progreso global del curso (contadores del documento del curso)
+            stats = course_data.get("stats", {})
+            if not CourseService._has_counters(stats):
+                stats = CourseService._count_documents(docs_ref)
+            progress = CourseService._progress(stats)
 
             # 4. Construir respuesta (conservando el mismo formato JSON)
             return {
@@ -152,7 +273,9 @@ class CourseService:
                     "duration": course_data.get("duration", "0 semanas"),
                     "difficulty": course_data.get("difficulty", "Principiante"),
                     "progress": progress,
-                    "lastAccessed": course_data.get("lastAccessed", datetime.utcnow().isoformat()),
+                    # Sin valor por defecto con la hora actual: el cuerpo debe ser
+                    # el mismo mientras no cambie el ETag
+                    "lastAccessed": course_data.get("lastAccessed"),
                     "modules": documents  # Key "modules" (frontend) -> contiene "documents" (backend)
                 }
             }
@@ -1,8 +1,15 @@
+import asyncio
+import hashlib
 from datetime import datetime
 from pathlib import Path 
-from typing import List
+from typing import Dict, List, Optional
+from google.api_core.exceptions import AlreadyExists, Conflict
 from google.cloud import firestore
-from app.services.firebase import db
+from starlette.concurrency import run_in_threadpool
+from app.config import BATCH_READ_CONCURRENCY
+from app.services.etag import make_etag
+from app.services.firebase import get_db
+from app.services.search_service import course_indexes
 from app.models import (
     DocumentCreate,
     DocumentResponse,
@@ -13,14 +20,94 @@ from app.models import (
 )
 
 
+# Límite de operaciones por batch de Firestore
+MAX_BATCH_OPERATIONS = 500
+# Preguntas incluidas en el resumen ``quizzes`` del documento (el listado
+# completo está en la subcolección; el documento tiene un límite de 1 MiB)
+MAX_QUIZ_SUMMARIES = 100
+
+
+class DuplicateUploadError(Exception):
+    """El mismo contenido (o clave de idempotencia) ya se guardó en el curso."""
+
+
+def _content_hash_ref(course_id: str, content_hash: str):
+    return get_db().collection("courses").document(course_id)\
+                   .collection("contentHashes").document(content_hash)
+
+
+def _idempotency_key_ref(course_id: str, idempotency_key: str):
+    # La clave la elige el cliente: se usa su hash como ID de documento
+    key_id = hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()
+    return get_db().collection("courses").document(course_id)\
+                   .collection("idempotencyKeys").document(key_id)
+
+
+def find_existing_upload(
+    course_id: str,
+    content_hash: str,
+    idempotency_key: Optional[str] = None
+) -> Optional[str]:
+    """
+    Devuelve el ID del documento ya creado para esta subida, o None.
+
+    Busca primero por clave de idempotencia y luego por hash de contenido.
+    Si la clave se reutiliza con otro contenido lanza ValueError.
+    """
+    if idempotency_key:
+        key_doc = _idempotency_key_ref(course_id, idempotency_key).get()
+        if key_doc.exists:
+            key_data = key_doc.to_dict()
+            if key_data.get("contentHash") != content_hash:
+                raise ValueError("La clave de idempotencia ya se usó con otro archivo")
+            return key_data["documentId"]
+
+    hash_doc = _content_hash_ref(course_id, content_hash).get()
+    if hash_doc.exists:
+        return hash_doc.to_dict()["documentId"]
+    return None
+
+
+async def get_document(course_id: str, document_id: str) -> DocumentResponse:
+    """Lee un documento ya procesado junto con sus quizzes y opciones."""
+    doc = get_db().collection("courses").document(course_id)\
+                  .collection("documents").document(document_id).get()
+    if not doc.exists:
+        raise ValueError("Documento no encontrado")
+
+    document_data = doc.to_dict()
+    document_data.pop("quizzes", None)
+    document_data.setdefault("createdAt", document_data.get("processedAt"))
+    quizzes = await get_quizzes_by_document(course_id, document_id)
+    return DocumentResponse(
+        document_id=doc.id,
+        quizzes=quizzes,
+        **document_data
+    )
+
+
 async def save_to_firestore(
     course_id: str,
     filename: str,
     file_path: str,
     quizzes: List[QuizCreate],
-    title: str  # Añade este parámetro
+    title: str,  # Añade este parámetro
+    content_hash: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    search_lemmas: Optional[Dict[str, str]] = None
 ) -> DocumentResponse:
-    """Guarda documento y quizzes en Firestore con estructura relacional"""
+    """
+    Guarda documento y quizzes en Firestore con estructura relacional.
+
+    Si se indica ``content_hash`` (y opcionalmente ``idempotency_key``) se
+    registran en el mismo batch con ``create``: si otra petición ya guardó
+    ese contenido en el curso, el batch completo falla y se lanza
+    DuplicateUploadError sin escribir nada (ni incrementar contadores).
+
+    ``search_lemmas`` (forma -> lema, de spaCy) se guarda en el documento y
+    se usa para añadirlo al índice de búsqueda del curso.
+    """
+    db = get_db()
     batch = db.batch()
     
     # 1. Crear referencia al documento principal
@@ -38,12 +125,225 @@ async def save_to_firestore(
     ).dict(by_alias=True)
     
     document_data["processedAt"] = datetime.utcnow()
+    document_data["createdAt"] = datetime.utcnow()
+    # Versión de los quizzes del documento: base de su ETag
+    document_data["version"] = 1
+    if content_hash:
+        document_data["contentHash"] = content_hash
+    document_data["searchLemmas"] = search_lemmas or {}
     
     # 3. Preparar quizzes y opciones para Firestore
+    quizzes_data, options_data = add_quizzes_to_batch(batch, doc_ref, quizzes)
+    
+    # 4. Añadir quizzes al documento principal (solo metadata)
+    document_data["quizzes"] = quiz_summaries(quizzes_data)
+    document_data["lastOrder"] = len(quizzes)
+    
+    # 5. Añadir operación del documento principal
+    batch.set(doc_ref, document_data)
+    
+    # 6. Actualizar contador en el curso padre
+    course_ref = db.collection("courses").document(course_id)
+    batch.update(course_ref, {
+        "stats.documentCount": firestore.Increment(1),
+        "stats.questionCount": firestore.Increment(len(quizzes)),
+        "stats.documentsVersion": firestore.Increment(1),
+        "stats.lastUpdate": datetime.utcnow()
+    })
+    
+    # 7. Registrar hash de contenido y clave de idempotencia (fallan si ya existen)
+    if content_hash:
+        batch.create(_content_hash_ref(course_id, content_hash), {
+            "documentId": document_id,
+            "createdAt": datetime.utcnow()
+        })
+        if idempotency_key:
+            batch.create(_idempotency_key_ref(course_id, idempotency_key), {
+                "documentId": document_id,
+                "contentHash": content_hash,
+                "createdAt": datetime.utcnow()
+            })
+
+    # 8. Ejecutar todas las operaciones atómicamente
+    try:
+        batch.commit()
+    except (AlreadyExists, Conflict) as e:
+        raise DuplicateUploadError("El documento ya fue subido a este curso") from e
+    
+    document_data.pop("quizzes", None)  # Borra 'quizzes' si existe
+    document_data.pop("searchLemmas", None)
+    # 9. Construir respuesta estructurada
+    response = DocumentResponse(
+        document_id=document_id,
+        quizzes=_build_quiz_responses(quizzes_data, options_data),
+        **document_data
+    )
+    # 10. Añadir al índice de búsqueda del curso (si está en memoria)
+    course_indexes.add_document(course_id, document_id, title, response.quizzes, search_lemmas)
+    return response
+
+
+async def replace_quizzes(
+    course_id: str,
+    document_id: str,
+    quizzes: List[QuizCreate],
+    kept_quizzes: Optional[List[QuizResponse]] = None,
+    document_fields: Optional[dict] = None
+) -> DocumentResponse:
+    """
+    Sustituye los quizzes (y opciones) de un documento existente.
+
+    Los quizzes de ``kept_quizzes`` se conservan tal cual y los nuevos se
+    añaden a continuación. ``document_fields`` actualiza otros campos del
+    documento (p. ej. tras una revisión); si cambia ``contentHash`` se
+    actualiza también el registro de deduplicación del curso.
+
+    Los nuevos quizzes y los contadores se escriben en un batch atómico;
+    los anteriores se borran después en batches de hasta 500 operaciones.
+    """
+    db = get_db()
+    doc_ref = db.collection("courses").document(course_id)\
+               .collection("documents").document(document_id)
+    snapshot = doc_ref.get()
+    if not snapshot.exists:
+        raise ValueError("Documento no encontrado")
+
+    previous = snapshot.to_dict()
+    kept_quizzes = kept_quizzes or []
+    kept_ids = {q.quiz_id for q in kept_quizzes}
+
+    # Los conservados y su orden se leen de la subcolección (el resumen del
+    # documento no incluye las preguntas importadas)
+    existing = doc_ref.collection("quizzes").select(["questionText", "order"]).stream()
+    kept_summaries = []
+    removed_refs = []
+    for quiz_doc in existing:
+        if quiz_doc.id in kept_ids:
+            quiz_data = quiz_doc.to_dict()
+            kept_summaries.append({
+                "quizId": quiz_doc.id,
+                "questionText": quiz_data.get("questionText", ""),
+                "order": quiz_data.get("order", 0)
+            })
+        else:
+            removed_refs.append(quiz_doc.reference)
+    kept_summaries.sort(key=lambda summary: summary["order"])
+
+    # 1. Crear los nuevos quizzes a continuación de los conservados, junto
+    # con la actualización del documento y del curso (un solo batch atómico)
+    batch = db.batch()
+    first_order = max((q["order"] for q in kept_summaries), default=0) + 1
+    quizzes_data, options_data = add_quizzes_to_batch(batch, doc_ref, quizzes, first_order)
+    document_update = {
+        **(document_fields or {}),
+        "numQuestions": len(kept_quizzes) + len(quizzes),
+        "quizzes": (kept_summaries + quiz_summaries(quizzes_data))[:MAX_QUIZ_SUMMARIES],
+        "lastOrder": first_order + len(quizzes) - 1,
+        "processedAt": datetime.utcnow(),
+        "version": firestore.Increment(1)
+    }
+    batch.update(doc_ref, document_update)
+
+    # 2. Mover el registro de deduplicación si cambió el contenido
+    new_hash = document_update.get("contentHash")
+    old_hash = previous.get("contentHash")
+    if new_hash and new_hash != old_hash:
+        if old_hash:
+            batch.delete(_content_hash_ref(course_id, old_hash))
+        batch.create(_content_hash_ref(course_id, new_hash), {
+            "documentId": document_id,
+            "createdAt": datetime.utcnow()
+        })
+
+    previous_questions = previous.get("numQuestions", len(previous.get("quizzes", [])))
+    batch.update(db.collection("courses").document(course_id), {
+        "stats.questionCount": firestore.Increment(document_update["numQuestions"] - previous_questions),
+        "stats.documentsVersion": firestore.Increment(1),
+        "stats.lastUpdate": datetime.utcnow()
+    })
+    try:
+        batch.commit()
+    except (AlreadyExists, Conflict) as e:
+        raise DuplicateUploadError("Ese contenido ya existe en otro documento del curso") from e
+
+    # 3. Borrar los quizzes anteriores (con opciones y estadísticas) en
+    # batches de hasta 500 operaciones: pueden ser miles tras una importación
+    delete_quizzes(removed_refs)
+
+    document_data = {**previous, **document_update}
+    document_data.pop("quizzes", None)
+    document_data.pop("version", None)
+    search_lemmas = document_data.pop("searchLemmas", None)
+    document_data.setdefault("createdAt", document_data.get("processedAt"))
+    response = DocumentResponse(
+        document_id=document_id,
+        quizzes=kept_quizzes + _build_quiz_responses(quizzes_data, options_data),
+        **document_data
+    )
+    course_indexes.add_document(course_id, document_id, response.title, response.quizzes, search_lemmas)
+    return response
+
+
+def set_document_completed(course_id: str, document_id: str, completed: bool) -> dict:
+    """
+    Marca un documento como completado (o no) y actualiza en la misma
+    transacción el contador stats.completedCount del curso.
+    """
+    db = get_db()
+    course_ref = db.collection("courses").document(course_id)
+    doc_ref = course_ref.collection("documents").document(document_id)
+
+    @firestore.transactional
+    def update(transaction) -> bool:
+        snapshot = doc_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise ValueError("Documento no encontrado")
+        if bool(snapshot.to_dict().get("completed", False)) == completed:
+            return False  # Sin cambios: no se toca el contador
+        transaction.update(doc_ref, {"completed": completed})
+        transaction.update(course_ref, {
+            "stats.completedCount": firestore.Increment(1 if completed else -1),
+            "stats.documentsVersion": firestore.Increment(1),
+            "stats.lastUpdate": datetime.utcnow()
+        })
+        return True
+
+    changed = update(db.transaction())
+    return {"documentId": document_id, "completed": completed, "changed": changed}
+
+
+def get_quizzes_etag(course_id: str, document_id: str) -> Optional[str]:
+    """
+    ETag de los quizzes de un documento, leyendo sólo el documento principal
+    (sin tocar las subcolecciones de quizzes ni opciones). None si no existe.
+    """
+    doc = get_db().collection("courses").document(course_id)\
+                  .collection("documents").document(document_id).get()
+    if not doc.exists:
+        return None
+    # Documentos previos al versionado: se usa la hora de última escritura
+    version = doc.to_dict().get("version") or doc.update_time
+    return make_etag("quizzes", course_id, document_id, version)
+
+
+def get_document_metadata(course_id: str, document_id: str) -> dict:
+    """Campos del documento principal (sin leer quizzes)."""
+    doc = get_db().collection("courses").document(course_id)\
+                  .collection("documents").document(document_id).get()
+    if not doc.exists:
+        raise ValueError("Documento no encontrado")
+    return doc.to_dict()
+
+
+def add_quizzes_to_batch(batch, doc_ref, quizzes: List[QuizCreate], first_order: int = 1):
+    """
+    Añade al batch los quizzes y sus opciones bajo ``doc_ref``.
+    Devuelve (quizzes_data, options_data) para construir la respuesta.
+    """
     quizzes_data = []
     options_data = []
     
-    for quiz_order, quiz in enumerate(quizzes, start=1):
+    for quiz_order, quiz in enumerate(quizzes, start=first_order):
         # Crear referencia para cada quiz
         quiz_ref = doc_ref.collection("quizzes").document()
         quiz_id = quiz_ref.id
@@ -79,77 +379,137 @@ async def save_to_firestore(
             "quiz_id": quiz_id,
             "quiz_data": quiz_data
         })
-    
-    # 4. Añadir quizzes al documento principal (solo metadata)
-    document_data["quizzes"] = [{
+
+    return quizzes_data, options_data
+
+
+def delete_quizzes(quiz_refs: list):
+    """Borra quizzes con sus opciones y shards de estadísticas, por batches."""
+    db = get_db()
+    batch = db.batch()
+    operations = 0
+    for quiz_ref in quiz_refs:
+        refs = [
+            *quiz_ref.collection("options").list_documents(),
+            *quiz_ref.collection("statsShards").list_documents(),
+            quiz_ref
+        ]
+        for ref in refs:
+            batch.delete(ref)
+            operations += 1
+            if operations == MAX_BATCH_OPERATIONS:
+                batch.commit()
+                batch = db.batch()
+                operations = 0
+    if operations:
+        batch.commit()
+
+
+def reserve_quiz_orders(doc_ref, count: int) -> int:
+    """
+    Reserva ``count`` posiciones consecutivas al final del documento y
+    devuelve la primera. Usa una transacción sobre ``lastOrder`` para que
+    dos importaciones simultáneas no repitan el mismo ``order``.
+    """
+    @firestore.transactional
+    def reserve(transaction) -> int:
+        snapshot = doc_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise ValueError("Documento no encontrado")
+        data = snapshot.to_dict()
+        last_order = data.get("lastOrder")
+        if last_order is None:
+            # Documentos anteriores a lastOrder
+            last_order = max(
+                max((q.get("order", 0) for q in data.get("quizzes", [])), default=0),
+                data.get("numQuestions", 0)
+            )
+        transaction.update(doc_ref, {"lastOrder": last_order + count})
+        return last_order + 1
+
+    return reserve(get_db().transaction())
+
+
+def quiz_summaries(quizzes_data: List[dict]) -> List[dict]:
+    """Metadata de los quizzes que se guarda en el documento principal."""
+    return [{
         "quizId": q["quiz_id"],
         "questionText": q["quiz_data"]["questionText"],
         "order": q["quiz_data"]["order"]
     } for q in quizzes_data]
-    
-    # 5. Añadir operación del documento principal
-    batch.set(doc_ref, document_data)
-    
-    # 6. Actualizar contador en el curso padre
-    course_ref = db.collection("courses").document(course_id)
-    batch.update(course_ref, {
-        "stats.documentCount": firestore.Increment(1),
-        "stats.lastUpdate": datetime.utcnow()
-    })
-    
-    # 7. Ejecutar todas las operaciones atómicamente
-    batch.commit()
-    
-    document_data["createdAt"] = datetime.utcnow()
-    document_data.pop("quizzes", None)  # Borra 'quizzes' si existe
-    # 8. Construir respuesta estructurada
-    return DocumentResponse(
-        document_id=document_id,
-        quizzes=[
-            QuizResponse(
-                quiz_id=q["quiz_id"],
-                options=[
-                    OptionResponse(
-                        option_id=opt["option_id"],
-                        **opt["option_data"]
-                    ) for opt in options_data 
-                    if opt["quiz_id"] == q["quiz_id"]
-                ],
-                **q["quiz_data"]
-            ) for q in quizzes_data
-        ],
-        **document_data
-    )
 
-async def get_quizzes_by_document(course_id: str, document_id: str) -> List[QuizResponse]:
-    try:
-        quizzes_ref = db.collection("courses").document(course_id).collection("documents").document(document_id).collection("quizzes")
-        docs = quizzes_ref.stream()
 
-        quizzes = []
+def _build_quiz_responses(quizzes_data: List[dict], options_data: List[dict]) -> List[QuizResponse]:
+    return [
+        QuizResponse(
+            quiz_id=q["quiz_id"],
+            options=[
+                OptionResponse(
+                    option_id=opt["option_id"],
+                    **opt["option_data"]
+                ) for opt in options_data 
+                if opt["quiz_id"] == q["quiz_id"]
+            ],
+            **q["quiz_data"]
+        ) for q in quizzes_data
+    ]
 
+def read_quiz(quiz_doc) -> QuizResponse:
+    """Construye un QuizResponse a partir del snapshot del quiz, leyendo sus opciones."""
+    quiz_data = quiz_doc.to_dict()
+    quiz_id = quiz_doc.id
 
-        for quiz_doc in quizzes_ref.stream():
-            quiz_data = quiz_doc.to_dict()
-            quiz_id = quiz_doc.id
+    # Leer opciones de este quiz
+    options_ref = quiz_doc.reference.collection("options")
+    options = []
 
-            # Leer opciones de este quiz
-            options_ref = quiz_doc.reference.collection("options")
-            options = []
+    for option_doc in options_ref.stream():
+        option_data = option_doc.to_dict()
+        option_data["optionId"] = option_doc.id
+        options.append(OptionResponse(**option_data))
 
-            for option_doc in options_ref.stream():
-                option_data = option_doc.to_dict()
-                option_data["optionId"] = option_doc.id
-                options.append(OptionResponse(**option_data))
+    # Agregar alias esperados
+    quiz_data["quizId"] = quiz_id
+    quiz_data["createdAt"] = quiz_data.get("createdAt", datetime.utcnow())
+    quiz_data["options"] = options
 
-            # Agregar alias esperados
-            quiz_data["quizId"] = quiz_id
-            quiz_data["createdAt"] = quiz_data.get("createdAt", datetime.utcnow())
-            quiz_data["options"] = options
+    return QuizResponse(**quiz_data)
 
-            quizzes.append(QuizResponse(**quiz_data))
-        
-        return quizzes
+
+async def get_quizzes_by_document(course_id: str, document_id: str) -> List[QuizResponse]:
+    quizzes_by_document = await get_quizzes_by_documents(course_id, [document_id])
+    return quizzes_by_document[document_id]
+
+
+async def get_quizzes_by_documents(
+    course_id: str,
+    document_ids: List[str],
+    concurrency: int = BATCH_READ_CONCURRENCY
+) -> Dict[str, List[QuizResponse]]:
+    """
+    Obtiene los quizzes (con opciones) de varios documentos a la vez.
+
+    Las lecturas de cada documento y de las opciones de cada quiz se hacen
+    en paralelo, con a lo sumo ``concurrency`` lecturas en vuelo.
+    Los documentos sin quizzes (o inexistentes) devuelven una lista vacía.
+    """
+    try:
+        db = get_db()
+        documents_ref = db.collection("courses").document(course_id).collection("documents")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def read(func, *args):
+            async with semaphore:
+                return await run_in_threadpool(func, *args)
+
+        async def fetch_document(document_id: str) -> List[QuizResponse]:
+            quizzes_ref = documents_ref.document(document_id).collection("quizzes")
+            quiz_docs = await read(lambda: list(quizzes_ref.stream()))
+            return list(await asyncio.gather(*(read(read_quiz, quiz_doc) for quiz_doc in quiz_docs)))
+
+        unique_ids = list(dict.fromkeys(document_ids))
+        results = await asyncio.gather(*(fetch_document(document_id) for document_id in unique_ids))
+        return dict(zip(unique_ids, results))
 
     except Exception as e:
         raise ValueError(f"No se pudieron obtener los quizzes: {str(e)}")
@@ -0,0 +1,32 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    ETag débil a partir de metadatos de versión guardados al escribir. Es
+    débil porque identifica el contenido, no los bytes: con RESPONSE_GZIP
+    el mismo recurso se sirve comprimido o sin comprimir.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comprueba la cabecera If-None-Match (admite listas, "*" y prefijo W/)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    etag = _opaque_tag(etag)
+    return any(_opaque_tag(tag.strip()) == etag for tag in if_none_match.split(","))
+
+
+def _opaque_tag(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    """Cabeceras para respuestas con ETag: el cliente debe revalidar siempre."""
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
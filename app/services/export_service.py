@@ -0,0 +1,106 @@
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, Union
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from app.config import EXPORT_CONCURRENCY
+from app.services.document_service import read_quiz
+from app.services.firebase import get_db
+
+
+# Campos de uso interno del backend que no se exportan
+INTERNAL_DOCUMENT_FIELDS = ("searchLemmas", "contentHash", "version", "lastOrder")
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _ndjson(record: Dict[str, Any]) -> str:
+    return json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+
+
+def get_course_data(course_id: str) -> Dict[str, Any]:
+    """Lee el documento del curso (para validar que existe antes de exportar)."""
+    course_doc = get_db().collection("courses").document(course_id).get()
+    if not course_doc.exists:
+        raise ValueError("Curso no encontrado")
+    return course_doc.to_dict()
+
+
+def _quiz_line(document_id: str, quiz_doc) -> str:
+    quiz = read_quiz(quiz_doc)
+    return _ndjson({
+        "type": "quiz",
+        "documentId": document_id,
+        **quiz.dict(by_alias=True)
+    })
+
+
+async def _drain(pending: Deque[Union[str, asyncio.Future]], limit: int) -> AsyncIterator[str]:
+    """
+    Saca del frente de la cola las líneas ya listas y, mientras la cola
+    tenga ``limit`` elementos o más, espera también las que no lo están.
+    """
+    while pending:
+        item = pending[0]
+        if isinstance(item, asyncio.Future):
+            if len(pending) < limit and not item.done():
+                return
+            # Sigue en la cola mientras se espera: si se cancela la exportación se cancela
+            item = await item
+        pending.popleft()
+        yield item
+
+
+async def export_course(
+    course_id: str,
+    course_data: Dict[str, Any],
+    concurrency: int = EXPORT_CONCURRENCY
+) -> AsyncIterator[str]:
+    """
+    Genera el curso como NDJSON mientras se lee de Firestore:
+
+        {"type": "course", ...}
+        {"type": "document", ...}
+        {"type": "quiz", "documentId": ..., "options": [...]}
+
+    Las opciones de cada quiz (la parte N de las N+1 lecturas) se leen en
+    paralelo. La cola de salida guarda a lo sumo ``concurrency`` líneas
+    (listas o en lectura), así la memoria no depende del tamaño del curso;
+    cada línea sale, en orden, en cuanto están listas ella y las anteriores.
+    """
+    yield _ndjson({"type": "course", "id": course_id, **course_data})
+
+    course_ref = get_db().collection("courses").document(course_id)
+    # Cola ordenada de líneas listas (str) o lecturas en curso (Future)
+    pending: Deque[Union[str, asyncio.Future]] = deque()
+
+    try:
+        async for document in iterate_in_threadpool(course_ref.collection("documents").stream()):
+            document_data = document.to_dict()
+            document_data.pop("quizzes", None)  # resumen redundante con las líneas "quiz"
+            for field in INTERNAL_DOCUMENT_FIELDS:
+                document_data.pop(field, None)
+            pending.append(_ndjson({"type": "document", "id": document.id, **document_data}))
+            async for line in _drain(pending, concurrency):
+                yield line
+
+            quizzes = document.reference.collection("quizzes").stream()
+            async for quiz_doc in iterate_in_threadpool(quizzes):
+                pending.append(asyncio.ensure_future(
+                    run_in_threadpool(_quiz_line, document.id, quiz_doc)
+                ))
+                async for line in _drain(pending, concurrency):
+                    yield line
+
+        async for line in _drain(pending, 1):
+            yield line
+    finally:
+        # Cliente desconectado o error: no dejar lecturas huérfanas
+        for item in pending:
+            if isinstance(item, asyncio.Future):
+                item.cancel()
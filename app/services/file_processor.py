@@ -1,6 +1,7 @@
 from pathlib import Path
+import hashlib
 import io
-from typing import Optional
+from typing import List, Optional
 from PyPDF2 import PdfReader
 from docx import Document
 from fastapi import UploadFile
@@ -9,9 +10,22 @@ from pptx import Presentation
 
 async def extract_text_from_file(file: UploadFile, extension: str) -> str:
     """Extrae texto de archivos PDF, DOCX o PPTX."""
+    content = await file.read()
+    return extract_text_from_bytes(content, extension)
+
+
+def extract_text_from_bytes(content: bytes, extension: str) -> str:
+    """Extrae texto del contenido (ya leído) de un PDF, DOCX o PPTX."""
+    return "\n".join(extract_chunks_from_bytes(content, extension))
+
+
+def extract_chunks_from_bytes(content: bytes, extension: str) -> List[str]:
+    """
+    Extrae el texto dividido en fragmentos naturales del documento:
+    páginas (PDF), párrafos (DOCX) o diapositivas (PPTX).
+    Unidos con saltos de línea dan el mismo texto que extract_text_from_bytes.
+    """
     try:
-        content = await file.read()
-        
         if extension == '.pdf':
             with io.BytesIO(content) as pdf_file:
                 pdf_reader = PdfReader(pdf_file)
@@ -22,7 +36,7 @@ async def extract_text_from_file(file: UploadFile, extension: str) -> str:
                         text_pages.append(page_text)
                 if not text_pages:
                     raise ValueError("El PDF no contiene texto extraíble")
-                return "\n".join(text_pages)
+                return text_pages
         
         elif extension == '.docx':
             with io.BytesIO(content) as doc_file:
@@ -30,21 +44,29 @@ async def extract_text_from_file(file: UploadFile, extension: str) -> str:
                 paragraphs = [p.text for p in doc.paragraphs if p.text and p.text.strip()]
                 if not paragraphs:
                     raise ValueError("El DOCX no contiene texto extraíble")
-                return "\n".join(paragraphs)
+                return paragraphs
         
         elif extension == '.pptx':
             with io.BytesIO(content) as ppt_file:
                 prs = Presentation(ppt_file)
-                text = []
+                slides = []
                 for slide in prs.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text") and shape.text and shape.text.strip():
-                            text.append(shape.text)
-                if not text:
+                    text = [
+                        shape.text for shape in slide.shapes
+                        if hasattr(shape, "text") and shape.text and shape.text.strip()
+                    ]
+                    if text:
+                        slides.append("\n".join(text))
+                if not slides:
                     raise ValueError("El PPTX no contiene texto extraíble")
-                return "\n".join(text)
+                return slides
         
         raise ValueError(f"Formato de archivo no soportado: {extension}")
     
     except Exception as e:
-        raise ValueError(f"Error al procesar archivo: {str(e)}") from e
\ No newline at end of file
+        raise ValueError(f"Error al procesar archivo: {str(e)}") from e
+
+
+def fingerprint_chunk(text: str) -> str:
+    """Huella de un fragmento, insensible a cambios de espacios en blanco."""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
@@ -1,16 +1,55 @@
 import firebase_admin
 from firebase_admin import credentials, storage, firestore
 import os
+import threading
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
 load_dotenv()
 
-cred = credentials.Certificate(os.getenv("FIREBASE_CREDENTIALS_PATH"))
-firebase_admin.initialize_app(cred, {
-    "storageBucket": os.getenv("FIREBASE_STORAGE_BUCKET")
-})
+# Los clientes se crean la primera vez que se usan (no al importar el módulo)
+# para que el arranque del servidor sea rápido.
+_lock = threading.Lock()
+_app = None
+_db = None
+_bucket = None
 
 
-db = firestore.client()
-bucket = storage.bucket()
+def get_app():
+    """Inicializa la app de Firebase una sola vez (thread-safe)."""
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                cred = credentials.Certificate(os.getenv("FIREBASE_CREDENTIALS_PATH"))
+                _app = firebase_admin.initialize_app(cred, {
+                    "storageBucket": os.getenv("FIREBASE_STORAGE_BUCKET")
+                })
+    return _app
+
+
+def get_db():
+    """Cliente de Firestore, creado bajo demanda."""
+    global _db
+    if _db is None:
+        get_app()
+        with _lock:
+            if _db is None:
+                _db = firestore.client()
+    return _db
+
+
+def get_bucket():
+    """Bucket de Storage, creado bajo demanda."""
+    global _bucket
+    if _bucket is None:
+        get_app()
+        with _lock:
+            if _bucket is None:
+                _bucket = storage.bucket()
+    return _bucket
+
+
+def is_ready() -> bool:
+    """Indica si los clientes de Firebase ya están inicializados."""
+    return _db is not None and _bucket is not None
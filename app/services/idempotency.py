@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class InFlightRegistry:
+    """
+    Agrupa peticiones idénticas que llegan mientras otra está en curso
+    ("single flight"): sólo la primera ejecuta el trabajo y las demás
+    esperan y reciben el mismo resultado (o la misma excepción).
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        while key in self._in_flight:
+            future = self._in_flight[key]
+            try:
+                # shield: si esta petición se cancela, la original sigue su curso
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # La petición original se canceló: se reintenta el trabajo
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita el aviso "exception was never retrieved" si nadie esperaba
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+
+# Subidas de documentos en curso, por curso y hash de contenido
+upload_flights = InFlightRegistry()
@@ -1,12 +1,99 @@
-import spacy
-from random import sample, shuffle
-from typing import List, Tuple, Dict
+import re
+import threading
+from enum import Enum
+from random import Random
+from typing import List, Tuple, Dict, Optional, TYPE_CHECKING
 from pathlib import Path
+from app.config import SPACY_MODEL, SPACY_FAST_MODEL, SPACY_EXCLUDE, SPACY_FAST_EXCLUDE
 from app.models.quiz import QuizCreate
 from app.models.option import OptionBase
 
-# Cargar modelo de lenguaje en español
-nlp = spacy.load("es_core_news_lg")
+if TYPE_CHECKING:
+    from spacy.language import Language
+
+
+class GenerationMode(str, Enum):
+    """Modo de generación: "fast" usa un pipeline más liviano."""
+    FAST = "fast"
+    QUALITY = "quality"
+
+
+PIPELINE_SETTINGS = {
+    GenerationMode.QUALITY: (SPACY_MODEL, SPACY_EXCLUDE),
+    GenerationMode.FAST: (SPACY_FAST_MODEL, SPACY_FAST_EXCLUDE),
+}
+
+# Los modelos se cargan bajo demanda (no al importar el módulo) para que
+# el servidor arranque rápido; el lock evita cargas duplicadas entre hilos.
+_pipelines: Dict[GenerationMode, "Language"] = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_nlp(mode: GenerationMode = GenerationMode.QUALITY) -> "Language":
+    """Devuelve el pipeline de spaCy del modo indicado, cargándolo una sola vez."""
+    mode = GenerationMode(mode)
+    nlp = _pipelines.get(mode)
+    if nlp is None:
+        with _pipelines_lock:
+            nlp = _pipelines.get(mode)
+            if nlp is None:
+                import spacy  # Importación diferida: spaCy tarda en importarse
+
+                model_name, exclude = PIPELINE_SETTINGS[mode]
+                nlp = spacy.load(model_name, exclude=exclude)
+                _pipelines[mode] = nlp
+    return nlp
+
+
+def pipeline_id(mode: GenerationMode = GenerationMode.QUALITY) -> str:
+    """
+    Identificador del pipeline (modelo, versión y componentes excluidos).
+    Un Doc serializado sólo se reutiliza con el mismo pipeline que lo creó.
+    """
+    model_name, exclude = PIPELINE_SETTINGS[GenerationMode(mode)]
+    meta = get_nlp(mode).meta
+    parts = [model_name, meta.get("version", "0")]
+    if exclude:
+        parts.append("sin-" + "-".join(sorted(exclude)))
+    return "-".join(parts)
+
+
+def serialize_docs(docs) -> bytes:
+    """Serializa Docs (un DocBin comprimido) para guardarlos como artefacto."""
+    from spacy.tokens import DocBin
+
+    return DocBin(docs=docs).to_bytes()
+
+
+def deserialize_docs(data: bytes, mode: GenerationMode = GenerationMode.QUALITY) -> list:
+    """Reconstruye los Docs serializados con serialize_docs usando el vocabulario del modo."""
+    from spacy.tokens import DocBin
+
+    return list(DocBin().from_bytes(data).get_docs(get_nlp(mode).vocab))
+
+
+def combine_docs(docs):
+    """
+    Une los Docs de cada fragmento en un solo Doc con el texto completo.
+
+    Se excluye el tensor: DocBin no lo guarda, así que los Docs reutilizados
+    de una versión anterior tienen un tensor vacío y los re-analizados uno
+    de tok2vec; ``Doc.from_docs`` no puede apilarlos. El generador no lo usa.
+    """
+    from spacy.tokens import Doc
+
+    return Doc.from_docs(docs, ensure_whitespace=False, exclude=["tensor"])
+
+
+def warm_up(mode: GenerationMode = GenerationMode.QUALITY) -> None:
+    """Carga el modelo y ejecuta un análisis de prueba para calentar cachés."""
+    get_nlp(mode)("El modelo de lenguaje está listo para generar preguntas.")
+
+
+def is_ready(mode: GenerationMode = GenerationMode.QUALITY) -> bool:
+    """Indica si el modelo del modo indicado ya está cargado."""
+    return GenerationMode(mode) in _pipelines
+
 
 class QuizGenerator:
     def __init__(self):
@@ -29,11 +116,26 @@ class QuizGenerator:
             ]
         }
 
+    def parse(self, text: str, mode: GenerationMode = GenerationMode.QUALITY):
+        """Analiza el texto con el pipeline de spaCy del modo indicado."""
+        return get_nlp(mode)(text)
+
+    def parse_chunks(self, chunks: List[str], mode: GenerationMode = GenerationMode.QUALITY) -> list:
+        """
+        Analiza cada fragmento (página, párrafo, diapositiva) por separado,
+        para poder reutilizar los que no cambien en una revisión.
+        Cada fragmento termina en salto de línea, así combine_docs
+        reconstruye el texto completo.
+        """
+        return list(get_nlp(mode).pipe(chunk + "\n" for chunk in chunks))
+
     def generate_quizzes(
         self,
         text: str,
         num_questions: int = 5,
-        num_options: int = 4
+        num_options: int = 4,
+        mode: GenerationMode = GenerationMode.QUALITY,
+        seed: Optional[int] = None
     ) -> List[QuizCreate]:
         """
         Genera quizzes a partir de un texto usando NLP.
@@ -42,26 +144,57 @@ class QuizGenerator:
             text (str): Texto extraído del documento
             num_questions (int): Número de preguntas a generar
             num_options (int): Opciones por pregunta
+            mode (GenerationMode): Pipeline de spaCy a usar ("fast" o "quality")
+            seed (int, opcional): Semilla para obtener preguntas reproducibles
             
         Returns:
             List[QuizCreate]: Lista de quizzes con preguntas y opciones
         """
-        doc = nlp(text)
+        # El texto se analiza una sola vez y el Doc se reutiliza en cada paso
+        doc = self.parse(text, mode)
+        return self.generate_quizzes_from_doc(doc, num_questions, num_options, seed)
+
+    def generate_quizzes_from_doc(
+        self,
+        doc,
+        num_questions: int = 5,
+        num_options: int = 4,
+        seed: Optional[int] = None,
+        source_docs: Optional[list] = None
+    ) -> List[QuizCreate]:
+        """
+        Genera quizzes a partir de un Doc de spaCy ya analizado
+        (por ejemplo, uno deserializado de los artefactos guardados).
+
+        Si se indica ``source_docs`` (p. ej. los fragmentos que cambiaron en
+        una revisión) las preguntas salen de esos Docs; los distractores se
+        siguen tomando de todo el documento.
+        """
+        rng = Random(seed)
+        text = doc.text
         quizzes = []
         
         # 1. Extraer frases clave
         key_phrases = self._extract_key_phrases(doc)
+        candidate_phrases = key_phrases
+        if source_docs is not None:
+            candidate_phrases = [
+                phrase for source in source_docs
+                for phrase in self._extract_key_phrases(source)
+            ]
         
-        # 2. Seleccionar frases para preguntas (evitando duplicados)
-        selected_phrases = sample(
-            list(set(key_phrases)),  # Eliminar duplicados
-            min(num_questions, len(key_phrases))
+        # 2. Seleccionar frases para preguntas (evitando duplicados, en orden
+        # de aparición para que la semilla sea reproducible)
+        unique_phrases = list(dict.fromkeys(candidate_phrases))
+        selected_phrases = rng.sample(
+            unique_phrases,
+            min(num_questions, len(unique_phrases))
         )
         
         # 3. Generar pregunta para cada frase clave
         for phrase, phrase_type in selected_phrases:
-            question_text = self._generate_question_text(phrase, phrase_type)
-            options = self._generate_options(phrase, text, num_options)
+            question_text = self._generate_question_text(phrase, phrase_type, rng)
+            options = self._generate_options(phrase, doc, key_phrases, num_options, rng)
             
             quizzes.append(QuizCreate(
                 questionText=question_text,  # Usa el alias JSON
@@ -72,6 +205,28 @@ class QuizGenerator:
         
         return quizzes
 
+    def lemma_table(self, doc, texts: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Forma -> lema (en minúsculas) de las palabras del Doc, para el índice
+        de búsqueda. Sólo se guardan las formas cuyo lema es distinto y, si se
+        indica ``texts`` (preguntas, opciones), sólo las que aparecen en ellos.
+        """
+        words = None
+        if texts is not None:
+            words = {word.lower() for text in texts for word in re.findall(r"\w+", text)}
+
+        table = {}
+        for token in doc:
+            if not token.is_alpha:
+                continue
+            form = token.lower_
+            if words is not None and form not in words:
+                continue
+            lemma = token.lemma_.lower()
+            if lemma and lemma != form:
+                table.setdefault(form, lemma)
+        return table
+
     def _extract_key_phrases(self, doc) -> List[Tuple[str, str]]:
         """
         Extrae frases clave del texto con su tipo gramatical.
@@ -98,10 +253,10 @@ class QuizGenerator:
         
         return phrases
 
-    def _generate_question_text(self, phrase: str, phrase_type: str) -> str:
+    def _generate_question_text(self, phrase: str, phrase_type: str, rng: Random) -> str:
         """Genera el texto de la pregunta usando plantillas."""
         templates = self.question_templates.get(phrase_type, self.question_templates["DEFAULT"])
-        template = sample(templates, 1)[0]
+        template = rng.choice(templates)
         
         # Adaptar la frase a la plantilla
         if phrase_type == "VERB":
@@ -115,8 +270,10 @@ class QuizGenerator:
     def _generate_options(
         self,
         correct_phrase: str,
-        full_text: str,
-        num_options: int
+        doc,
+        key_phrases: List[Tuple[str, str]],
+        num_options: int,
+        rng: Random
     ) -> List[OptionBase]:
         """
         Genera opciones de respuesta con:
@@ -124,20 +281,19 @@ class QuizGenerator:
         - n-1 distractores plausibles
         """
         # 1. Respuesta correcta (en contexto)
-        correct_answer = self._extract_answer(correct_phrase, full_text)
+        correct_answer = self._extract_answer(correct_phrase, doc)
         options = [OptionBase(text=correct_answer, is_correct=True)]
         
         # 2. Generar distractores
-        distractors = self._generate_distractors(correct_phrase, full_text, num_options-1)
+        distractors = self._generate_distractors(correct_phrase, key_phrases, num_options-1, rng)
         options.extend([OptionBase(text=d, is_correct=False) for d in distractors])
         
         # 3. Mezclar aleatoriamente
-        shuffle(options)
+        rng.shuffle(options)
         return options
 
-    def _extract_answer(self, phrase: str, text: str) -> str:
+    def _extract_answer(self, phrase: str, doc) -> str:
         """Extrae la respuesta correcta del contexto."""
-        doc = nlp(text)
         for sent in doc.sents:
             if phrase in sent.text:
                 # Limitar longitud y limpiar
@@ -147,19 +303,19 @@ class QuizGenerator:
     def _generate_distractors(
         self,
         correct_phrase: str,
-        full_text: str,
-        num_distractors: int
+        key_phrases: List[Tuple[str, str]],
+        num_distractors: int,
+        rng: Random
     ) -> List[str]:
         """Genera opciones incorrectas pero plausibles."""
-        doc = nlp(full_text)
         distractors = []
         
         # 1. Distractores de frases similares
         similar_phrases = [
-            p for p in self._extract_key_phrases(doc) 
+            p for p in key_phrases
             if p[0] != correct_phrase
         ]
-        distractors.extend(sample(
+        distractors.extend(rng.sample(
             [p[0] for p in similar_phrases],
             min(num_distractors, len(similar_phrases))
         ))
@@ -173,7 +329,7 @@ class QuizGenerator:
         ]
         
         while len(distractors) < num_distractors:
-            distractors.append(sample(generic_distractors, 1)[0])
+            distractors.append(rng.choice(generic_distractors))
         
         return distractors[:num_distractors]
 
@@ -0,0 +1,338 @@
+import asyncio
+import codecs
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from google.cloud import firestore
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from app.config import IMPORT_MAX_INFLIGHT_BATCHES, IMPORT_MAX_REPORTED_ERRORS
+from app.models import QuizCreate
+from app.services.document_service import add_quizzes_to_batch, reserve_quiz_orders
+from app.services.firebase import get_db
+from app.services.search_service import course_indexes
+
+logger = logging.getLogger(__name__)
+
+# Límite de operaciones por batch de Firestore
+MAX_BATCH_OPERATIONS = 500
+# Posiciones (order) que se reservan de una vez en el documento
+ORDER_BLOCK_SIZE = 5000
+# Quizzes importados entre actualizaciones de los contadores
+COUNTER_UPDATE_EVERY = 5000
+
+_decoder = json.JSONDecoder()
+
+
+class _ParseError(Exception):
+    """Registro que no es JSON válido (se reporta como error del registro)."""
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Registros de un cuerpo NDJSON, una línea a la vez."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield _loads(line)
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield _loads(buffer)
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Elementos de un arreglo JSON (``[{...}, {...}]``) decodificados a medida
+    que llegan, sin cargar el arreglo completo en memoria. Un elemento mal
+    formado corta la lectura con ``ValueError`` en cuanto se recibe entero.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    finished = False
+
+    async for chunk in chunks:
+        buffer = buffer[position:] + decoder.decode(chunk)
+        position = 0
+        while not finished:
+            position = _skip_whitespace(buffer, position)
+            if position >= len(buffer):
+                break
+            char = buffer[position]
+            if not started:
+                if char != "[":
+                    raise ValueError("Se esperaba un arreglo JSON")
+                started = True
+                position += 1
+            elif char == ",":
+                position += 1
+            elif char == "]":
+                finished = True
+            else:
+                try:
+                    record, end = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as e:
+                    if _element_end(buffer, position) is None:
+                        # Elemento incompleto: esperar más datos
+                        break
+                    raise ValueError(f"JSON inválido: {e.msg}")
+                if not isinstance(record, (dict, list)) and _element_end(buffer, position) is None:
+                    # Un número al final del buffer puede seguir en el próximo trozo
+                    break
+                position = end
+                yield record
+
+    if not finished:
+        raise ValueError("Arreglo JSON incompleto o inválido")
+
+
+def _element_end(buffer: str, position: int) -> Optional[int]:
+    """
+    Fin del elemento que empieza en ``position``, o None si el buffer se
+    acaba antes (el elemento aún no llegó entero). Sólo sigue cadenas y
+    corchetes, así distingue un elemento truncado de uno mal formado.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(position, len(buffer)):
+        char = buffer[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if depth == 0:
+                    return index + 1
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            if depth <= 1:
+                return index + 1 if depth else index
+            depth -= 1
+        elif depth == 0 and char in ", \t\r\n":
+            return index
+    return None
+
+
+def _skip_whitespace(buffer: str, position: int) -> int:
+    while position < len(buffer) and buffer[position] in " \t\r\n":
+        position += 1
+    return position
+
+
+def _loads(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return _ParseError(f"JSON inválido: {e.msg}")
+
+
+def validate_quiz(record: Any) -> QuizCreate:
+    """Valida un registro contra QuizCreate/OptionBase."""
+    if isinstance(record, _ParseError):
+        raise ValueError(str(record))
+    if not isinstance(record, dict):
+        raise ValueError("Cada registro debe ser un objeto JSON")
+    quiz = QuizCreate.parse_obj(record)
+    if not quiz.options:
+        raise ValueError("El quiz no tiene opciones")
+    if not any(option.is_correct for option in quiz.options):
+        raise ValueError("El quiz no tiene ninguna opción correcta")
+    if 1 + len(quiz.options) > MAX_BATCH_OPERATIONS:
+        raise ValueError("El quiz tiene demasiadas opciones")
+    return quiz
+
+
+class ImportReport:
+    """Resultado de una importación: contadores, errores por registro y ritmo."""
+
+    def __init__(self):
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.stream_error: Optional[str] = None
+        self._start = time.monotonic()
+
+    def add_error(self, index: int, error: str, count: int = 1):
+        self.failed += count
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"index": index, "error": error})
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._start
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errorsTruncated": self.failed > len(self.errors),
+            "streamError": self.stream_error,
+            "elapsedSeconds": round(elapsed, 3),
+            "recordsPerSecond": round(self.imported / elapsed, 1) if elapsed else 0.0
+        }
+
+
+async def valid_quizzes(
+    records: AsyncIterator[Any],
+    report: ImportReport
+) -> AsyncIterator[Tuple[int, QuizCreate]]:
+    """
+    (índice, quiz) de los registros válidos. Los inválidos se anotan en el
+    reporte; si el cuerpo está mal formado se anota y se termina.
+    """
+    index = -1
+    try:
+        async for record in records:
+            index += 1
+            report.received += 1
+            try:
+                quiz = validate_quiz(record)
+            except ValidationError as e:
+                report.add_error(index, "; ".join(
+                    f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                ))
+                continue
+            except ValueError as e:
+                report.add_error(index, str(e))
+                continue
+            yield index, quiz
+    except ValueError as e:
+        # Cuerpo mal formado: se guarda lo leído hasta aquí y se reporta
+        report.add_error(index + 1, str(e), count=0)
+        report.stream_error = str(e)
+
+
+async def pack_batches(
+    quizzes: AsyncIterator[Tuple[int, QuizCreate]],
+    max_operations: int = MAX_BATCH_OPERATIONS
+) -> AsyncIterator[Tuple[List[int], List[QuizCreate]]]:
+    """Agrupa los quizzes en batches de a lo sumo ``max_operations`` (quiz + opciones)."""
+    indexes: List[int] = []
+    batch: List[QuizCreate] = []
+    operations = 0
+    async for index, quiz in quizzes:
+        quiz_operations = 1 + len(quiz.options)
+        if batch and operations + quiz_operations > max_operations:
+            yield indexes, batch
+            indexes, batch, operations = [], [], 0
+        indexes.append(index)
+        batch.append(quiz)
+        operations += quiz_operations
+    if batch:
+        yield indexes, batch
+
+
+async def import_quizzes(
+    course_id: str,
+    document_id: str,
+    records: AsyncIterator[Any],
+    max_inflight_batches: int = IMPORT_MAX_INFLIGHT_BATCHES
+) -> Dict[str, Any]:
+    """
+    Importa quizzes validando y escribiendo a medida que se leen.
+
+    Los quizzes válidos se agrupan en batches de hasta 500 operaciones
+    (quiz + opciones) que se confirman en paralelo, con a lo sumo
+    ``max_inflight_batches`` en vuelo; así la memoria queda acotada aunque
+    se importen decenas de miles de preguntas. Un batch que falla marca
+    como fallidos sólo sus registros.
+
+    Los batches sólo escriben en la subcolección ``quizzes``: el documento
+    principal se toca una vez por cada ``ORDER_BLOCK_SIZE`` posiciones
+    reservadas y una vez por cada ``COUNTER_UPDATE_EVERY`` quizzes
+    guardados (``numQuestions``, ``version`` y los contadores del curso),
+    más una al final. Los resúmenes del documento no crecen con la
+    importación; la lista completa se lee de la subcolección por ``order``.
+    """
+    db = get_db()
+    course_ref = db.collection("courses").document(course_id)
+    doc_ref = course_ref.collection("documents").document(document_id)
+    snapshot = await run_in_threadpool(doc_ref.get)
+    if not snapshot.exists:
+        raise ValueError("Documento no encontrado")
+
+    report = ImportReport()
+    inflight: "set[asyncio.Future]" = set()
+    # Rango de posiciones reservado y aún sin usar: [next_order, end_order)
+    next_order = end_order = 0
+    # Quizzes guardados que aún no suman en los contadores
+    uncounted = 0
+
+    def write_batch(quizzes: List[QuizCreate], first_order: int):
+        batch = db.batch()
+        add_quizzes_to_batch(batch, doc_ref, quizzes, first_order=first_order)
+        batch.commit()
+
+    def write_counters(count: int):
+        batch = db.batch()
+        batch.update(doc_ref, {
+            "numQuestions": firestore.Increment(count),
+            "processedAt": datetime.utcnow(),
+            "version": firestore.Increment(1)
+        })
+        batch.update(course_ref, {
+            "stats.questionCount": firestore.Increment(count),
+            "stats.lastUpdate": datetime.utcnow()
+        })
+        batch.commit()
+
+    async def commit(quizzes: List[QuizCreate], indexes: List[int], first_order: int):
+        nonlocal uncounted
+        try:
+            await run_in_threadpool(write_batch, quizzes, first_order)
+            report.imported += len(indexes)
+            uncounted += len(indexes)
+        except Exception as e:
+            report.add_error(indexes[0], f"Error al guardar el batch: {e}", count=len(indexes))
+
+    async def update_counters():
+        nonlocal uncounted
+        count, uncounted = uncounted, 0
+        try:
+            await run_in_threadpool(write_counters, count)
+        except Exception:
+            uncounted += count
+            raise
+
+    async for indexes, quizzes in pack_batches(valid_quizzes(records, report)):
+        if end_order - next_order < len(quizzes):
+            # Las posiciones que sobran del bloque anterior quedan sin usar
+            next_order = await run_in_threadpool(
+                reserve_quiz_orders, doc_ref, max(ORDER_BLOCK_SIZE, len(quizzes))
+            )
+            end_order = next_order + max(ORDER_BLOCK_SIZE, len(quizzes))
+        # Respetar el máximo de batches en vuelo
+        while len(inflight) >= max_inflight_batches:
+            done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+            inflight.difference_update(done)
+        inflight.add(asyncio.ensure_future(commit(quizzes, indexes, next_order)))
+        next_order += len(quizzes)
+
+        if uncounted >= COUNTER_UPDATE_EVERY:
+            try:
+                await update_counters()
+            except Exception as e:
+                # Se reintenta con la siguiente actualización
+                logger.warning("No se pudieron actualizar los contadores: %s", e)
+
+    if inflight:
+        await asyncio.wait(inflight)
+    if uncounted:
+        await update_counters()
+
+    if report.imported:
+        # Las preguntas importadas no pasan por spaCy: se reindexa el curso
+        course_indexes.invalidate(course_id)
+    return report.to_dict()
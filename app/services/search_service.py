@@ -0,0 +1,271 @@
+import math
+import re
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from starlette.concurrency import run_in_threadpool
+from app.config import SEARCH_INDEX_TTL, SEARCH_MAX_COURSES
+from app.models import QuizResponse
+from app.services.firebase import get_db
+from app.services.idempotency import InFlightRegistry
+
+_WORD_RE = re.compile(r"\w+")
+
+# Palabras frecuentes que no aportan a la búsqueda (ya normalizadas)
+STOP_WORDS = frozenset("""
+a al algo ante como con cual cuales cuando de del desde donde el ella en entre
+es esta este esto fue ha hay la las le les lo los mas me mi muy no o para pero
+por que quien se ser estar haber sin sobre su sus te tu un una uno unos unas y ya
+""".split())
+
+# Peso de cada campo en la puntuación
+TITLE_WEIGHT = 3.0
+QUESTION_WEIGHT = 2.0
+TEXT_WEIGHT = 1.0
+
+
+def normalize(word: str) -> str:
+    """Minúsculas y sin tildes: "Revolución" -> "revolucion"."""
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def quiz_texts(title: str, quizzes: List[Any]) -> List[str]:
+    """Textos indexados de un documento (para acotar su tabla de lemas)."""
+    texts = [title]
+    for quiz in quizzes:
+        texts.append(quiz.question_text)
+        texts.append(quiz.context)
+        texts.extend(option.text for option in quiz.options)
+    return texts
+
+
+class CourseIndex:
+    """
+    Índice invertido de los documentos y quizzes de un curso.
+
+    Cada palabra se reduce a su lema con la tabla forma -> lema que spaCy
+    calculó al generar los quizzes (``searchLemmas`` del documento), así
+    "revoluciones" encuentra "revolución". Las consultas usan la unión de
+    las tablas del curso y no necesitan el modelo de NLP.
+    """
+
+    def __init__(self):
+        self.built_at = time.monotonic()
+        # término -> {entrada -> peso}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._entry_terms: Dict[str, List[str]] = {}
+        self._document_entries: Dict[str, List[str]] = defaultdict(list)
+        self._lemmas: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def terms(self, text: str) -> List[str]:
+        terms = []
+        for word in _WORD_RE.findall(text):
+            form = normalize(word)
+            term = self._lemmas.get(form, form)
+            if len(term) > 1 and term not in STOP_WORDS:
+                terms.append(term)
+        return terms
+
+    def add_document(
+        self,
+        document_id: str,
+        title: str,
+        quizzes: List[QuizResponse],
+        lemmas: Optional[Dict[str, str]] = None,
+        description: str = ""
+    ):
+        """Indexa (o reindexa) un documento y sus quizzes."""
+        self.remove_document(document_id)
+        for form, lemma in (lemmas or {}).items():
+            self._lemmas.setdefault(normalize(form), normalize(lemma))
+
+        self._add_entry(document_id, document_id, {
+            "type": "document",
+            "documentId": document_id,
+            "text": title
+        }, [(title, TITLE_WEIGHT), (description, TEXT_WEIGHT)])
+
+        for quiz in quizzes:
+            self._add_entry(document_id, f"{document_id}/{quiz.quiz_id}", {
+                "type": "quiz",
+                "documentId": document_id,
+                "quizId": quiz.quiz_id,
+                "text": quiz.question_text
+            }, [
+                (quiz.question_text, QUESTION_WEIGHT),
+                (quiz.context, TEXT_WEIGHT),
+                *((option.text, TEXT_WEIGHT) for option in quiz.options)
+            ])
+
+    def _add_entry(self, document_id: str, key: str, entry: Dict[str, Any], fields):
+        weights: Dict[str, float] = defaultdict(float)
+        for text, weight in fields:
+            for term in self.terms(text or ""):
+                weights[term] += weight
+        if not weights:
+            return
+        for term, weight in weights.items():
+            self._postings[term][key] = weight
+        self._entries[key] = entry
+        self._entry_terms[key] = list(weights)
+        self._document_entries[document_id].append(key)
+
+    def remove_document(self, document_id: str):
+        for key in self._document_entries.pop(document_id, []):
+            for term in self._entry_terms.pop(key, []):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[term]
+            self._entries.pop(key, None)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Entradas que contienen los términos de la consulta, primero las que
+        contienen más términos y después por tf-idf.
+        """
+        terms = list(dict.fromkeys(self.terms(query)))
+        total = len(self._entries)
+        scores: Dict[str, float] = defaultdict(float)
+        matches: Dict[str, int] = defaultdict(int)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for key, weight in postings.items():
+                scores[key] += weight * idf
+                matches[key] += 1
+
+        ranked = sorted(scores, key=lambda key: (matches[key], scores[key]), reverse=True)
+        return [
+            {**self._entries[key], "score": round(scores[key], 4)}
+            for key in ranked[:limit]
+        ]
+
+
+async def _load_course_index(course_id: str) -> CourseIndex:
+    """Construye el índice de un curso leyendo sus documentos y quizzes."""
+    # Import local: document_service actualiza este índice al guardar
+    from app.services.document_service import get_quizzes_by_documents
+
+    course_ref = get_db().collection("courses").document(course_id)
+    course_doc = await run_in_threadpool(course_ref.get)
+    if not course_doc.exists:
+        raise ValueError("Curso no encontrado")
+
+    documents_query = course_ref.collection("documents").select(["title", "description", "searchLemmas"])
+    documents = await run_in_threadpool(lambda: list(documents_query.stream()))
+    quizzes = await get_quizzes_by_documents(course_id, [document.id for document in documents])
+
+    index = CourseIndex()
+    for document in documents:
+        data = document.to_dict()
+        index.add_document(
+            document.id,
+            data.get("title", ""),
+            quizzes.get(document.id, []),
+            data.get("searchLemmas"),
+            data.get("description", "")
+        )
+    return index
+
+
+class SearchIndexRegistry:
+    """
+    Índices en memoria por curso, de a lo sumo ``max_courses`` (LRU).
+
+    El índice de un curso se construye la primera vez que se busca en él y
+    se reconstruye pasados ``ttl`` segundos, para recoger cambios hechos en
+    otros workers. Los documentos guardados en este proceso se añaden al
+    índice al momento, sin esperar la reconstrucción.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[CourseIndex]] = _load_course_index,
+        ttl: float = SEARCH_INDEX_TTL,
+        max_courses: int = SEARCH_MAX_COURSES
+    ):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_courses = max(1, max_courses)
+        self._indexes: "OrderedDict[str, CourseIndex]" = OrderedDict()
+        self._builds = InFlightRegistry()
+        # Documentos guardados mientras se construye el índice del curso
+        self._pending_updates: Dict[str, list] = {}
+        # Cursos invalidados mientras se construía su índice
+        self._stale_builds: Set[str] = set()
+
+    async def get(self, course_id: str) -> CourseIndex:
+        index = self._indexes.get(course_id)
+        if index is not None and time.monotonic() - index.built_at < self.ttl:
+            self._indexes.move_to_end(course_id)
+            return index
+        return await self._builds.run(course_id, lambda: self._build(course_id))
+
+    async def _build(self, course_id: str) -> CourseIndex:
+        self._pending_updates[course_id] = []
+        self._stale_builds.discard(course_id)
+        try:
+            index = await self._loader(course_id)
+            # Lo guardado durante la lectura puede no estar en ella
+            for args in self._pending_updates[course_id]:
+                index.add_document(*args)
+        finally:
+            self._pending_updates.pop(course_id, None)
+
+        if course_id in self._stale_builds:
+            # Invalidado durante la lectura (p. ej. una importación): sirve a
+            # quien lo esperaba, pero no se guarda
+            self._stale_builds.discard(course_id)
+            return index
+
+        self._indexes[course_id] = index
+        self._indexes.move_to_end(course_id)
+        while len(self._indexes) > self.max_courses:
+            self._indexes.popitem(last=False)
+        return index
+
+    def add_document(
+        self,
+        course_id: str,
+        document_id: str,
+        title: str,
+        quizzes: List[QuizResponse],
+        lemmas: Optional[Dict[str, str]] = None
+    ):
+        """Actualiza el índice del curso (si está en memoria) con un documento."""
+        args = (document_id, title, quizzes, lemmas)
+        if course_id in self._pending_updates:
+            self._pending_updates[course_id].append(args)
+        index = self._indexes.get(course_id)
+        if index is not None:
+            index.add_document(*args)
+
+    def invalidate(self, course_id: str):
+        """Descarta el índice del curso: se reconstruye en la próxima búsqueda."""
+        self._indexes.pop(course_id, None)
+        if course_id in self._pending_updates:
+            self._stale_builds.add(course_id)
+
+    async def search(self, course_id: str, query: str, limit: int = 20) -> Dict[str, Any]:
+        index = await self.get(course_id)
+        start = time.perf_counter()
+        results = index.search(query, limit)
+        return {
+            "query": query,
+            "results": results,
+            "tookMs": round((time.perf_counter() - start) * 1000, 3)
+        }
+
+
+# Instancia global
+course_indexes = SearchIndexRegistry()
@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+from typing import BinaryIO, Optional
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from app.config import STORAGE_CHUNK_SIZE
+from app.services.firebase import get_bucket
+
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 del contenido del archivo (hex)."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def storage_path_for(digest: str, extension: str) -> str:
+    """
+    Ruta direccionada por contenido: el mismo archivo subido a distintos
+    cursos (o con distinto nombre) se guarda una sola vez.
+    """
+    return f"uploads/{digest[:2]}/{digest}{extension}"
+
+
+def upload_original(
+    file_obj: BinaryIO,
+    digest: str,
+    extension: str,
+    content_type: Optional[str] = None
+) -> str:
+    """
+    Sube el archivo original a Storage y devuelve su ruta.
+
+    Usa subida resumible por fragmentos directamente desde el archivo
+    temporal (sin volver a cargarlo en memoria). Si el contenido ya existe
+    en el bucket no se vuelve a subir. Es bloqueante: llamar desde un hilo.
+    """
+    path = storage_path_for(digest, extension)
+    blob = get_bucket().blob(path, chunk_size=STORAGE_CHUNK_SIZE)
+
+    if blob.exists():
+        return path
+
+    try:
+        # if_generation_match=0: sólo crea el objeto si no existe todavía
+        blob.upload_from_file(
+            file_obj,
+            rewind=True,
+            content_type=content_type,
+            if_generation_match=0
+        )
+    except PreconditionFailed:
+        # Otra subida concurrente con el mismo contenido llegó primero
+        pass
+    return path
+
+
+def artifact_prefix(digest: str) -> str:
+    """Carpeta de artefactos derivados (texto, Doc) de un contenido."""
+    return f"artifacts/{digest[:2]}/{digest}"
+
+
+def _upload_if_missing(path: str, data: bytes, content_type: str) -> str:
+    blob = get_bucket().blob(path)
+    try:
+        blob.upload_from_string(data, content_type=content_type, if_generation_match=0)
+    except PreconditionFailed:
+        # Ya existe: los artefactos dependen sólo del contenido
+        pass
+    return path
+
+
+def _download_or_none(path: str) -> Optional[bytes]:
+    try:
+        return get_bucket().blob(path).download_as_bytes()
+    except NotFound:
+        return None
+
+
+def save_text_artifact(digest: str, text: str) -> str:
+    """Guarda el texto extraído comprimido con gzip. Bloqueante."""
+    return _upload_if_missing(
+        f"{artifact_prefix(digest)}/text.txt.gz",
+        gzip.compress(text.encode("utf-8")),
+        "application/gzip"
+    )
+
+
+def load_text_artifact(digest: str) -> Optional[str]:
+    """Texto extraído guardado para este contenido, o None si no existe."""
+    data = _download_or_none(f"{artifact_prefix(digest)}/text.txt.gz")
+    return gzip.decompress(data).decode("utf-8") if data is not None else None
+
+
+def save_doc_artifact(digest: str, pipeline: str, doc_bytes: bytes) -> str:
+    """Guarda un Doc de spaCy serializado (DocBin) para el pipeline dado."""
+    return _upload_if_missing(
+        f"{artifact_prefix(digest)}/{pipeline}.spacy",
+        doc_bytes,
+        "application/octet-stream"
+    )
+
+
+def load_doc_artifact(digest: str, pipeline: str) -> Optional[bytes]:
+    """DocBin serializado para este contenido y pipeline, o None."""
+    return _download_or_none(f"{artifact_prefix(digest)}/{pipeline}.spacy")
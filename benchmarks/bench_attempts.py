@@ -0,0 +1,175 @@
+"""
+Prueba de carga del envío de intentos contra un Firestore falso en memoria.
+
+Simula ``--students`` estudiantes respondiendo a la vez los ``--quizzes``
+quizzes de un documento (un quiz en vivo) y compara:
+
+    directo    un batch por intento, contador único por quiz
+    agrupado   AttemptBuffer: batches agrupados y contadores fragmentados
+
+El backend falso aplica los ``Increment`` y tarda ``--latency`` ms por
+commit. Se reporta intentos por segundo, latencia del envío, commits,
+escrituras y el máximo de escrituras por segundo a un mismo documento
+(Firestore sostiene del orden de 1 por documento).
+
+Uso:
+    python -m benchmarks.bench_attempts [--students 500] [--quizzes 10] [--latency 20]
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from google.cloud import firestore
+from starlette.concurrency import run_in_threadpool
+from app.models.attempt import AttemptAnswer
+from app.services.attempt_service import AnswerKeyCache, AttemptBuffer, grade_answers
+
+COURSE_ID = "curso"
+DOCUMENT_ID = "documento"
+
+
+class FakeRef:
+    def __init__(self, path: str):
+        self.path = path
+
+
+class FakeBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self._db = db
+        self._writes = []
+
+    def set(self, ref: FakeRef, data: dict, merge: bool = False):
+        self._writes.append((ref.path, data))
+
+    def commit(self):
+        time.sleep(self._db.latency)
+        self._db.apply(self._writes)
+
+
+class FakeFirestore:
+    """Lo mínimo de google.cloud.firestore.Client que usa AttemptBuffer."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.documents = defaultdict(dict)
+        self.commits = 0
+        self.writes = 0
+        # (ruta, segundo) -> escrituras, para detectar documentos calientes
+        self.writes_per_second = Counter()
+        self._lock = threading.Lock()
+
+    def document(self, path: str) -> FakeRef:
+        return FakeRef(path)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def apply(self, writes):
+        second = int(time.monotonic())
+        with self._lock:
+            self.commits += 1
+            for path, data in writes:
+                self.writes += 1
+                self.writes_per_second[(path, second)] += 1
+                document = self.documents[path]
+                for field, value in data.items():
+                    if isinstance(value, firestore.Increment):
+                        document[field] = document.get(field, 0) + value.value
+                    else:
+                        document[field] = value
+
+    def counter_totals(self) -> tuple:
+        attempts = sum(doc.get("attempts", 0) for path, doc in self.documents.items() if "/quizzes/" in path)
+        correct = sum(doc.get("correct", 0) for path, doc in self.documents.items() if "/quizzes/" in path)
+        return attempts, correct
+
+
+def _answer_key(quizzes: int) -> dict:
+    return {f"q{i}": {"a": True, "b": False} for i in range(quizzes)}
+
+
+def _submission(student: int, quizzes: int) -> list:
+    # Aproximadamente la mitad de las respuestas son correctas
+    return [
+        AttemptAnswer(quiz_id=f"q{i}", option_id="a" if (student + i) % 2 else "b")
+        for i in range(quizzes)
+    ]
+
+
+async def _run_direct(db: FakeFirestore, answer_keys: AnswerKeyCache, students: int, quizzes: int) -> list:
+    def commit(student: int, graded: list):
+        batch = db.batch()
+        batch.set(db.document(f"courses/{COURSE_ID}/attempts/{student}"), {"answers": graded})
+        for answer in graded:
+            batch.set(db.document(f"courses/{COURSE_ID}/documents/{DOCUMENT_ID}/quizzes/{answer['quizId']}"), {
+                "attempts": firestore.Increment(1),
+                "correct": firestore.Increment(1 if answer["correct"] else 0)
+            }, merge=True)
+        batch.commit()
+
+    async def submit(student: int) -> float:
+        start = time.perf_counter()
+        graded = await grade_answers(COURSE_ID, DOCUMENT_ID, _submission(student, quizzes), answer_keys)
+        await run_in_threadpool(commit, student, graded)
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(submit(student) for student in range(students)))
+
+
+async def _run_buffered(db: FakeFirestore, answer_keys: AnswerKeyCache, students: int, quizzes: int) -> list:
+    buffer = AttemptBuffer(db_provider=lambda: db)
+    buffer.start()
+
+    async def submit(student: int) -> float:
+        start = time.perf_counter()
+        graded = await grade_answers(COURSE_ID, DOCUMENT_ID, _submission(student, quizzes), answer_keys)
+        await buffer.add(COURSE_ID, DOCUMENT_ID, f"user{student}", graded)
+        return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(submit(student) for student in range(students)))
+    await buffer.stop()
+    return latencies
+
+
+def _measure(name: str, runner, students: int, quizzes: int, latency: float) -> dict:
+    db = FakeFirestore(latency)
+    answer_keys = AnswerKeyCache(loader=lambda course_id, document_id: _answer_key(quizzes))
+    start = time.perf_counter()
+    latencies = asyncio.run(runner(db, answer_keys, students, quizzes))
+    elapsed = time.perf_counter() - start
+    attempts, correct = db.counter_totals()
+    assert attempts == students * quizzes, f"{name}: se perdieron respuestas ({attempts})"
+    return {
+        "name": name,
+        "rate": students / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000,
+        "commits": db.commits,
+        "writes": db.writes,
+        "hottest": max(db.writes_per_second.values()),
+        "correct_rate": correct / attempts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--quizzes", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=20, help="Latencia por commit (ms)")
+    args = parser.parse_args()
+
+    latency = args.latency / 1000
+    print("| Modo | Intentos/s | p50 (ms) | p99 (ms) | Commits | Escrituras | Máx. escrituras/s a un documento | Tasa de acierto |")
+    print("|---|---|---|---|---|---|---|---|")
+    for name, runner in (("directo", _run_direct), ("agrupado", _run_buffered)):
+        result = _measure(name, runner, args.students, args.quizzes, latency)
+        print(
+            f"| {result['name']} | {result['rate']:.0f} | {result['p50']:.1f} | {result['p99']:.1f} | "
+            f"{result['commits']} | {result['writes']} | {result['hottest']} | {result['correct_rate']:.2f} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
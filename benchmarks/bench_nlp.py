@@ -0,0 +1,98 @@
+"""
+Benchmark de pipelines de spaCy.
+
+Para cada combinación modelo/componentes excluidos reporta el tiempo de carga,
+la memoria residente (RSS) tras cargar y procesar, y el throughput en
+documentos por segundo. Cada configuración corre en un subproceso aparte
+para que la RSS no se contamine entre mediciones.
+
+Uso:
+    python -m benchmarks.bench_nlp [--docs 20] [--models es_core_news_sm,es_core_news_lg]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+SAMPLE_TEXT = (
+    "La fotosíntesis es el proceso mediante el cual las plantas, las algas y "
+    "algunas bacterias transforman la energía lumínica en energía química. "
+    "Durante la fase luminosa, la clorofila absorbe la luz y se produce "
+    "oxígeno a partir de la molécula de agua. En la fase oscura, conocida "
+    "como ciclo de Calvin, el dióxido de carbono se fija para formar glucosa. "
+    "Melvin Calvin recibió el Premio Nobel de Química en 1961 por describir "
+    "este ciclo en la Universidad de California. "
+) * 8
+
+EXCLUDE_VARIANTS = {
+    "completo": [],
+    "sin ner": ["ner"],
+}
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _run_child(model: str, exclude: list, num_docs: int) -> dict:
+    import spacy
+
+    start = time.perf_counter()
+    nlp = spacy.load(model, exclude=exclude)
+    load_time = time.perf_counter() - start
+
+    nlp(SAMPLE_TEXT)  # calentamiento
+    start = time.perf_counter()
+    for _ in range(num_docs):
+        nlp(SAMPLE_TEXT)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "load_s": load_time,
+        "rss_mb": _rss_mb(),
+        "docs_per_s": num_docs / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument(
+        "--models",
+        default="es_core_news_sm,es_core_news_md,es_core_news_lg"
+    )
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        model, exclude = json.loads(args.child)
+        print(json.dumps(_run_child(model, exclude, args.docs)))
+        return
+
+    print("| Modelo | Componentes | Carga (s) | RSS (MB) | Docs/s |")
+    print("|---|---|---|---|---|")
+    for model in args.models.split(","):
+        for label, exclude in EXCLUDE_VARIANTS.items():
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_nlp",
+                 "--docs", str(args.docs),
+                 "--child", json.dumps([model, exclude])],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(f"| {model} | {label} | error | - | - |")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(
+                f"| {model} | {label} | {result['load_s']:.2f} | "
+                f"{result['rss_mb']:.0f} | {result['docs_per_s']:.1f} |"
+            )
+
+
+if __name__ == "__main__":
+    main()
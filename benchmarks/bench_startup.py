@@ -0,0 +1,62 @@
+"""
+Benchmark del costo de arranque.
+
+Mide, en un intérprete nuevo, el tiempo y la RSS tras importar ``app.main``
+(lo que paga uvicorn antes de aceptar conexiones) y, por separado, el tiempo
+del calentamiento del modelo de NLP que ahora ocurre en segundo plano.
+
+Uso:
+    python -m benchmarks.bench_startup [--runs 3] [--skip-warmup]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD_CODE = """
+import json, time
+start = time.perf_counter()
+import app.main
+import_s = time.perf_counter() - start
+rss = 0
+with open("/proc/self/status") as status:
+    for line in status:
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1]) / 1024
+warmup_s = None
+if {warmup}:
+    from app.services import npl_service
+    start = time.perf_counter()
+    npl_service.warm_up()
+    warmup_s = time.perf_counter() - start
+print(json.dumps({{"import_s": import_s, "rss_mb": rss, "warmup_s": warmup_s}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-warmup", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD_CODE.format(warmup=not args.skip_warmup)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            sys.exit(proc.stderr)
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print("| Métrica | Mediana |")
+    print("|---|---|")
+    print(f"| Import app.main (s) | {statistics.median(r['import_s'] for r in results):.2f} |")
+    print(f"| RSS tras import (MB) | {statistics.median(r['rss_mb'] for r in results):.0f} |")
+    if not args.skip_warmup:
+        print(f"| Calentamiento NLP (s) | {statistics.median(r['warmup_s'] for r in results):.2f} |")
+
+
+if __name__ == "__main__":
+    main()
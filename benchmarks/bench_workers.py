@@ -0,0 +1,85 @@
+"""
+Reporte de memoria por worker (USS) con y sin precarga de modelos.
+
+Levanta gunicorn con ``gunicorn.conf.py`` dos veces (PRELOAD_MODELS=true y
+false), espera a que los workers carguen el modelo y lee
+``/proc/<pid>/smaps_rollup`` de cada worker:
+
+    USS = Private_Clean + Private_Dirty  (memoria exclusiva del worker)
+    PSS = memoria proporcional, reparte las páginas compartidas
+
+Uso:
+    python -m benchmarks.bench_workers [--workers 4] [--settle 60]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+
+def _smaps(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1]) / 1024  # MB
+    return values
+
+
+def _children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as children:
+        return [int(child) for child in children.read().split()]
+
+
+def _measure(preload: bool, workers: int, settle: float, port: int) -> dict:
+    env = {
+        **os.environ,
+        "PRELOAD_MODELS": "true" if preload else "false",
+        "WEB_CONCURRENCY": str(workers),
+        "BIND": f"127.0.0.1:{port}",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        time.sleep(settle)
+        master = _smaps(proc.pid)
+        worker_stats = [_smaps(pid) for pid in _children(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    uss = [w.get("Private_Clean", 0) + w.get("Private_Dirty", 0) for w in worker_stats]
+    return {
+        "workers": len(worker_stats),
+        "master_rss": master.get("Rss", 0),
+        "worker_uss": sum(uss) / len(uss) if uss else 0,
+        "total_pss": master.get("Pss", 0) + sum(w.get("Pss", 0) for w in worker_stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--settle", type=float, default=60,
+                        help="Segundos de espera para que los workers carguen el modelo")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print("| Modo | Workers | RSS maestro (MB) | USS medio por worker (MB) | PSS total (MB) |")
+    print("|---|---|---|---|---|")
+    for preload in (False, True):
+        result = _measure(preload, args.workers, args.settle, args.port)
+        label = "precarga en maestro" if preload else "carga independiente"
+        print(
+            f"| {label} | {result['workers']} | {result['master_rss']:.0f} | "
+            f"{result['worker_uss']:.0f} | {result['total_pss']:.0f} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Servidor multi-worker con modelos compartidos.
+
+    gunicorn -c gunicorn.conf.py
+
+El proceso maestro carga los modelos de spaCy antes de hacer fork, de modo
+que los workers comparten esas páginas de memoria (copy-on-write) en lugar
+de cargar cada uno su propia copia. Firebase NO se inicializa en el maestro:
+los clientes gRPC no son seguros tras un fork, así que cada worker los crea
+en su calentamiento.
+
+Variables de entorno:
+    BIND             Dirección de escucha (por defecto 0.0.0.0:8000)
+    WEB_CONCURRENCY  Número de workers (por defecto, núcleos disponibles)
+    PRELOAD_MODELS   "false" para que cada worker cargue su propio modelo
+"""
+import gc
+import multiprocessing
+import os
+
+from app.config import WARMUP_MODES
+
+wsgi_app = "app.main:app"
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+# La carga del modelo puede superar el timeout por defecto de 30 s
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("PRELOAD_MODELS", "true").lower() in ("1", "true", "yes")
+
+
+def on_starting(server):
+    """Se ejecuta en el maestro, antes de crear los workers."""
+    if not preload_app:
+        return
+    from app.services import npl_service
+
+    for mode in WARMUP_MODES:
+        npl_service.warm_up(mode)
+        server.log.info("Modelo '%s' precargado en el maestro", mode)
+
+    # Mueve los objetos ya creados a la generación permanente: el GC de los
+    # workers no los recorre y no rompe el copy-on-write al tocar sus cabeceras.
+    gc.freeze()
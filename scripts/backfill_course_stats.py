@@ -0,0 +1,43 @@
+"""
+Migración: inicializa stats.completedCount y stats.questionCount en los
+cursos creados antes de que existieran estos contadores y los marca con
+stats.countersVersion.
+
+Cada curso se migra en una transacción (ver
+``CourseService.backfill_course_stats``), así que puede ejecutarse con el
+servidor en marcha. Los cursos ya marcados no se tocan; los que sólo
+tienen contadores parciales (creados por Increment tras el despliegue) se
+recalculan.
+
+Uso:
+    python -m scripts.backfill_course_stats [--dry-run]
+"""
+import argparse
+from app.services.course_service import CourseService
+from app.services.firebase import get_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Sólo listar los cursos sin migrar")
+    args = parser.parse_args()
+
+    migrated = 0
+    for course_doc in get_db().collection("courses").stream():
+        stats = course_doc.to_dict().get("stats", {})
+        if CourseService._has_counters(stats):
+            continue
+        if args.dry_run:
+            print(f"{course_doc.id}: sin migrar")
+            continue
+        counters = CourseService.backfill_course_stats(course_doc.id)
+        if counters is not None:
+            migrated += 1
+            print(f"{course_doc.id}: {counters}")
+
+    print(f"Cursos migrados: {migrated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import asyncio
+from app.services.admission import AdmissionController, AdmissionRejected, GLOBAL_KEY
+
+
+def _burst(key: str, requests: int = 8):
+    controller = AdmissionController("test", max_concurrency=1, max_queue=16,
+                                     queue_timeout=30, max_queue_per_key=4)
+
+    async def request():
+        try:
+            async with controller.slot(key):
+                await asyncio.sleep(0.01)
+            return "ok"
+        except AdmissionRejected as e:
+            return e.status_code
+
+    async def main():
+        return await asyncio.gather(*(request() for _ in range(requests)))
+
+    return asyncio.run(main())
+
+
+def test_global_key_only_limited_by_global_queue():
+    assert _burst(GLOBAL_KEY) == ["ok"] * 8
+
+
+def test_per_key_queue_limit_returns_429():
+    results = _burst("course:abc")
+    assert results.count("ok") == 5
+    assert results.count(429) == 3
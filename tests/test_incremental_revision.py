@@ -0,0 +1,37 @@
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from app.api.documents import _parse_chunks
+from app.services import npl_service
+from app.services.npl_service import GenerationMode
+
+
+@pytest.fixture
+def nlp(monkeypatch):
+    # Pipeline mínimo con tok2vec: los Docs re-analizados tienen tensor
+    nlp = spacy.blank("es")
+    nlp.add_pipe("tok2vec")
+    nlp.initialize()
+    monkeypatch.setattr(npl_service, "get_nlp", lambda mode=GenerationMode.QUALITY: nlp)
+    return nlp
+
+
+def test_revise_one_slide_of_stored_doc(nlp):
+    slides = [
+        "La célula es la unidad básica de la vida.",
+        "El núcleo contiene el material genético.",
+        "Las mitocondrias producen energía para la célula.",
+    ]
+    stored = npl_service.serialize_docs(npl_service.quiz_generator.parse_chunks(slides))
+    previous_docs = npl_service.deserialize_docs(stored)
+
+    revised = [slides[0], "El núcleo guarda el ADN de la célula.", slides[2]]
+    chunk_docs, changed_docs = _parse_chunks(revised, previous_docs, GenerationMode.QUALITY)
+
+    assert [doc.text for doc in changed_docs] == [revised[1] + "\n"]
+    assert chunk_docs[0] is previous_docs[0] and chunk_docs[2] is previous_docs[2]
+
+    doc = npl_service.combine_docs(chunk_docs)
+    assert doc.text == "".join(slide + "\n" for slide in revised)
+    assert len(doc) == sum(len(chunk_doc) for chunk_doc in chunk_docs)
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import pytest
+from app.services import quiz_import
+from app.services.quiz_import import (
+    ImportReport,
+    MAX_BATCH_OPERATIONS,
+    import_quizzes,
+    iter_json_array,
+    iter_ndjson,
+    pack_batches,
+    valid_quizzes
+)
+
+
+def _record(question: str, options: int = 3) -> dict:
+    return {
+        "questionText": question,
+        "context": "contexto",
+        "options": [
+            {"text": f"opción {i}", "is_correct": i == 0} for i in range(options)
+        ]
+    }
+
+
+async def _chunks(body: bytes, size: int, read=None):
+    for start in range(0, len(body), size):
+        if read is not None:
+            read.append(start)
+        yield body[start:start + size]
+
+
+def _collect(records):
+    async def main():
+        return [record async for record in records]
+    return asyncio.run(main())
+
+
+def test_iter_ndjson_splits_lines_and_multibyte_characters():
+    records = [{"questionText": "¿Qué año?", "n": i} for i in range(20)]
+    body = "\n".join(json.dumps(record, ensure_ascii=False) for record in records).encode()
+
+    # Trozos de 3 bytes: cortan líneas y caracteres UTF-8 de varios bytes
+    assert _collect(iter_ndjson(_chunks(body, 3))) == records
+
+
+def test_iter_ndjson_reports_invalid_line_and_continues():
+    body = b'{"a": 1}\n{"a": \n{"a": 3}\n'
+
+    records = _collect(iter_ndjson(_chunks(body, 4)))
+
+    assert records[0] == {"a": 1}
+    assert isinstance(records[1], quiz_import._ParseError)
+    assert records[2] == {"a": 3}
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1024])
+def test_iter_json_array_decodes_across_chunks(size):
+    records = [{"texto": "revolución \"francesa\"", "n": i, "ok": True, "x": None} for i in range(10)]
+    body = json.dumps(records, ensure_ascii=False).encode()
+
+    assert _collect(iter_json_array(_chunks(body, size))) == records
+
+
+def test_iter_json_array_keeps_numbers_split_between_chunks():
+    assert _collect(iter_json_array(_chunks(b"[12345, 6.75]", 2))) == [12345, 6.75]
+
+
+def test_iter_json_array_fails_fast_on_malformed_element():
+    body = b'[{"a": 1}, {"a": }, ' + b", ".join(b'{"a": 2}' for _ in range(1000)) + b"]"
+    read = []
+
+    async def main():
+        records = []
+        with pytest.raises(ValueError):
+            async for record in iter_json_array(_chunks(body, 16, read)):
+                records.append(record)
+        return records
+
+    records = asyncio.run(main())
+
+    assert records == [{"a": 1}]
+    # No se espera al resto del cuerpo para reportar el error
+    assert len(read) < 5
+
+
+def test_iter_json_array_rejects_truncated_body():
+    with pytest.raises(ValueError):
+        _collect(iter_json_array(_chunks(b'[{"a": 1}, {"a": 2', 4)))
+
+
+def test_pack_batches_respects_operation_budget():
+    async def quizzes():
+        for index in range(300):
+            record = _record(f"p{index}", options=2 + index % 7)
+            yield index, quiz_import.validate_quiz(record)
+
+    batches = _collect(pack_batches(quizzes()))
+
+    indexes = [index for batch_indexes, _ in batches for index in batch_indexes]
+    assert indexes == list(range(300))
+    for batch_indexes, batch in batches:
+        assert len(batch_indexes) == len(batch)
+        assert sum(1 + len(quiz.options) for quiz in batch) <= MAX_BATCH_OPERATIONS
+    # Cada batch se llenó hasta donde cabía el siguiente quiz
+    for (_, batch), (_, following) in zip(batches, batches[1:]):
+        used = sum(1 + len(quiz.options) for quiz in batch)
+        assert used + 1 + len(following[0].options) > MAX_BATCH_OPERATIONS
+
+
+def test_quiz_with_too_many_options_is_rejected():
+    report = ImportReport()
+
+    async def records():
+        yield _record("grande", options=MAX_BATCH_OPERATIONS)
+        yield _record("normal")
+
+    quizzes = _collect(valid_quizzes(records(), report))
+
+    assert [index for index, _ in quizzes] == [1]
+    assert report.failed == 1
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.operations = []
+
+    def update(self, ref, data):
+        self.operations.append((ref, data))
+
+    def commit(self):
+        self.db.commits.append(self.operations)
+
+
+class FakeRef:
+    def __init__(self, path):
+        self.path = path
+
+    def collection(self, name):
+        return FakeCollection(f"{self.path}/{name}")
+
+    def get(self):
+        return type("Snapshot", (), {"exists": True})()
+
+
+class FakeCollection:
+    def __init__(self, path):
+        self.path = path
+
+    def document(self, document_id):
+        return FakeRef(f"{self.path}/{document_id}")
+
+
+class FakeDb:
+    def __init__(self):
+        self.commits = []
+        self.reservations = []
+        self.orders = []
+
+    def collection(self, name):
+        return FakeCollection(name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def test_import_touches_document_once_per_block(monkeypatch):
+    db = FakeDb()
+
+    def reserve_quiz_orders(doc_ref, count):
+        first = 1 + sum(db.reservations)
+        db.reservations.append(count)
+        return first
+
+    def add_quizzes_to_batch(batch, doc_ref, quizzes, first_order=1):
+        db.orders.extend(range(first_order, first_order + len(quizzes)))
+        batch.operations.extend(("quiz", None) for _ in range(sum(1 + len(q.options) for q in quizzes)))
+        return [], []
+
+    monkeypatch.setattr(quiz_import, "get_db", lambda: db)
+    monkeypatch.setattr(quiz_import, "reserve_quiz_orders", reserve_quiz_orders)
+    monkeypatch.setattr(quiz_import, "add_quizzes_to_batch", add_quizzes_to_batch)
+
+    async def records():
+        for index in range(12000):
+            yield _record(f"p{index}", options=4)
+
+    report = asyncio.run(import_quizzes("curso", "doc", records()))
+
+    assert report["imported"] == 12000
+    assert len(db.orders) == len(set(db.orders)) == 12000
+    assert len(db.reservations) == 3
+    counter_commits = [ops for ops in db.commits if ops and ops[0][0] != "quiz"]
+    assert 1 <= len(counter_commits) <= 3
+    assert sum(ops[0][1]["numQuestions"].value for ops in counter_commits) == 12000
+    assert all(len(ops) <= MAX_BATCH_OPERATIONS for ops in db.commits)
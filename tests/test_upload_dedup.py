@@ -0,0 +1,114 @@
+import asyncio
+import io
+from types import SimpleNamespace
+import pytest
+from app.api import documents
+from app.services.document_service import DuplicateUploadError
+from app.services.idempotency import InFlightRegistry
+from app.services.npl_service import GenerationMode
+
+COURSE_ID = "curso"
+DIGEST = "ab" * 32
+
+
+class FakeBackend:
+    """Firestore y Storage falsos: registro de hashes y contador del curso."""
+
+    def __init__(self, stale_lookups: int = 0):
+        self.content_hashes = {}
+        self.document_count = 0
+        self.writes = 0
+        self.parses = 0
+        # Lecturas que no ven lo guardado (simula otro worker en carrera)
+        self.stale_lookups = stale_lookups
+
+    def find_existing_upload(self, course_id, content_hash, idempotency_key=None):
+        if self.stale_lookups > 0:
+            self.stale_lookups -= 1
+            return None
+        return self.content_hashes.get((course_id, content_hash))
+
+    async def get_document(self, course_id, document_id):
+        return SimpleNamespace(document_id=document_id)
+
+    async def save_to_firestore(self, course_id, content_hash=None, **kwargs):
+        await asyncio.sleep(0)
+        key = (course_id, content_hash)
+        if key in self.content_hashes:
+            # batch.create del hash falla: no se escribe nada
+            raise DuplicateUploadError("El documento ya fue subido a este curso")
+        self.writes += 1
+        self.document_count += 1
+        document_id = f"doc{self.writes}"
+        self.content_hashes[key] = document_id
+        return SimpleNamespace(document_id=document_id)
+
+    def parse_chunks(self, chunks, mode):
+        self.parses += 1
+        return [SimpleNamespace(text=chunk) for chunk in chunks]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = FakeBackend()
+    generator = SimpleNamespace(
+        parse_chunks=backend.parse_chunks,
+        generate_quizzes_from_doc=lambda doc, **kwargs: [],
+        lemma_table=lambda doc, texts: {}
+    )
+    monkeypatch.setattr(documents, "find_existing_upload", backend.find_existing_upload)
+    monkeypatch.setattr(documents, "get_document", backend.get_document)
+    monkeypatch.setattr(documents, "save_to_firestore", backend.save_to_firestore)
+    monkeypatch.setattr(documents, "quiz_generator", generator)
+    monkeypatch.setattr(documents, "combine_docs", lambda docs: docs)
+    monkeypatch.setattr(documents, "_extract_chunks", lambda content, ext: ["texto " * 40])
+    monkeypatch.setattr(documents, "_store_artifacts", lambda *args: None)
+    monkeypatch.setattr(documents, "upload_original", lambda file_obj, digest, ext, content_type: f"uploads/{digest}{ext}")
+    return backend
+
+
+def _upload():
+    return documents._process_upload(
+        course_id=COURSE_ID,
+        file=SimpleNamespace(filename="apuntes.pdf", file=io.BytesIO(b"%PDF"), content_type="application/pdf"),
+        content=b"%PDF",
+        digest=DIGEST,
+        file_extension=".pdf",
+        num_questions=5,
+        num_options=4,
+        mode=GenerationMode.FAST,
+        user_id=None,
+        idempotency_key=None
+    )
+
+
+def test_concurrent_identical_uploads_are_processed_once(backend):
+    flights = InFlightRegistry()
+
+    async def main():
+        return await asyncio.gather(*(
+            flights.run(f"{COURSE_ID}:{DIGEST}", _upload) for _ in range(10)
+        ))
+
+    results = asyncio.run(main())
+
+    assert backend.parses == 1
+    assert backend.writes == 1
+    assert backend.document_count == 1
+    assert {result.document_id for result in results} == {"doc1"}
+
+
+def test_duplicate_upload_error_returns_existing_document(backend):
+    # Dos workers no ven el hash del otro al empezar: el segundo choca al guardar
+    backend.stale_lookups = 2
+
+    async def main():
+        first = await _upload()
+        second = await _upload()
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert backend.writes == 1
+    assert backend.document_count == 1
+    assert first.document_id == second.document_id == "doc1"